@@ -1,20 +1,163 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from starlette.datastructures import Headers
 from typing import Dict, List, Optional
+import asyncio
+import gzip
+import hashlib
+import itertools
+import gc
 import json
+import math
+import mimetypes
+import multiprocessing
 import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime
 
-app = FastAPI(title="Yangi Yil Konkursi API", version="1.0.0")
+try:
+    import brotli  # Ixtiyoriy: o'rnatilgan bo'lsa "br" kodlash ham beriladi
+except ImportError:
+    brotli = None
 
-# Ma'lumotlarni saqlash uchun oddiy lug'atlar
-users_db = {}  # Foydalanuvchilar ma'lumotlari
-leaderboard_data = []  # Reyting ma'lumotlari
+app = FastAPI(title="Yangi Yil Konkursi API", version="1.0.0")
 
+# Jarayon identifikatori: xotiradagi versiyalar qayta ishga tushganda noldan boshlanadi,
+# shuning uchun ulardan yasalgan ETag lar eski jarayonnikiga adashib mos kelmasligi kerak.
+# Ko'p jarayonli rejimda barcha ishchilar bosh jarayon bergan bitta qiymatni oladi.
+BOOT_ID = os.environ.get("BOOT_ID") or format(time.time_ns(), "x")
+
+# O'qish ko'rinishi: yozuvchilar qisqa davrda yangi o'zgarmas ko'rinish e'lon qiladi,
+# o'quvchilar undagi tayyor JSON baytlarini qaytaradi
+read_view = None
+user_views = OrderedDict()  # username -> (ETag, JSON baytlari), eng kam o'qilgani boshida
+dirty_users = set()  # Oxirgi e'londan keyin o'zgargan foydalanuvchilar
+
+# /stats uchun doimiy yangilanadigan faollik ro'yxati
+recent_activity = OrderedDict()  # username -> oxirgi faollik (time.time), eskisi boshida
+
+# Bitta so'rovda o'rni so'ralishi mumkin bo'lgan foydalanuvchilar soni
+MAX_BULK_RANKS = 100
+# Atrofdagi o'yinchilar so'rovida k ning yuqori chegarasi
+MAX_AROUND = 50
+
+# Bosish tezligi chegarasi (o'yindagi tapDelay = 100ms ga mos)
+MAX_TAPS_PER_SECOND = int(os.environ.get("MAX_TAPS_PER_SECOND", "10"))
+# Bitta to'plam oynasining eng katta uzunligi
+MAX_TAP_WINDOW_MS = 10000
+# Mijoz va server soatlari orasidagi tarmoq kechikishiga ruxsat
+TAP_CLOCK_TOLERANCE_MS = 2000
+# Shuncha vaqt to'plam kelmagan foydalanuvchining oynasi unutiladi. Shu vaqt ichida ruxsat etilgan
+# bosishlar bitta eng uzun "birinchi" to'plamdan ko'p, shuning uchun unutish qo'shimcha bosish bermaydi.
+TAP_WINDOW_IDLE_SECONDS = (MAX_TAP_WINDOW_MS + TAP_CLOCK_TOLERANCE_MS) / 1000
+# Xotirada saqlanadigan oynalar soni chegarasi. Faol oynalar o'chirilmaydi - to'lganda yangi
+# foydalanuvchilarning to'plamlari 503 bilan qaytariladi
+TAP_WINDOW_MAX_ENTRIES = int(os.environ.get("TAP_WINDOW_MAX_ENTRIES", "1000000"))
+
+# Ochko yozuvchi so'rovlar chegarasi: foydalanuvchiga soniyasiga shuncha so'rov,
+# qisqa portlash uchun shuncha zaxira bilan (o'yindagi tapDelay = 100ms dan bemalol yuqori)
+RATE_LIMIT_PER_SECOND = float(os.environ.get("RATE_LIMIT_PER_SECOND", "20"))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", "40"))
+# Xotirada saqlanadigan chelaklar soni chegarasi (tasodifiy nomlar bilan to'ldirishga qarshi)
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", "100000"))
+# /update_score tanasining eng katta hajmi - kattaroq tana chelakni chetlab o'tmasligi uchun 413 bilan rad etiladi
+RATE_LIMIT_MAX_BODY = 4096
+
+# Qabul nazorati: bir vaqtda shuncha HTTP so'rov bajariladi (0 - o'chirilgan), qolgani navbatda
+# kutadi. Ochko yozuvlari o'qishlardan oldin o'tadi va uzoqroq kutishi mumkin.
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "256"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "2048"))
+ADMISSION_WRITE_WAIT_MS = int(os.environ.get("ADMISSION_WRITE_WAIT_MS", "2000"))
+ADMISSION_READ_WAIT_MS = int(os.environ.get("ADMISSION_READ_WAIT_MS", "250"))
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "1"))
+# Uzoq ochiq turadigan oqimlar navbat joyini band qilmasligi kerak
+ADMISSION_EXEMPT_PATHS = ("/leaderboard/stream",)
+
+# WebSocket orqali ochko va o'rin shuncha ms da bir yuboriladi
+WS_ACK_INTERVAL_MS = int(os.environ.get("WS_ACK_INTERVAL_MS", "250"))
+
+# Jonli leaderboard o'zgarishlari shuncha ms da bir tarqatiladi
+LEADERBOARD_PUSH_INTERVAL_MS = int(os.environ.get("LEADERBOARD_PUSH_INTERVAL_MS", "500"))
+# Sekin mijoz uchun navbatdagi xabarlar chegarasi
+SSE_QUEUE_SIZE = 32
+SSE_KEEPALIVE_SECONDS = 15
+
+# Jonli leaderboard obunachilari va oxirgi tarqatilgan holat
+leaderboard_subscribers = set()
+stream_version = 0
+stream_snapshot = b""
+
+# Foydalanuvchi bo'yicha oxirgi qabul qilingan to'plam: [soat farqi, oyna oxiri, monotonic vaqt].
+# Eng uzoq ishlatilmagani boshida. Shared rejimda o'rniga ombordagi tap_windows jadvali ishlatiladi.
+tap_windows = OrderedDict()
+
+# Shuncha daqiqada faol bo'lganlar "faol" hisoblanadi
+ACTIVE_WINDOW_MINUTES = int(os.environ.get("ACTIVE_WINDOW_MINUTES", "5"))
+
+# Sahifa shablonlari, asset manbalari va build natijasi (static/ avtomatik yaratiladi)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(BASE_DIR, "pages")
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# O'qish ko'rinishi shuncha ms da bir yangilanadi
+SNAPSHOT_INTERVAL_MS = int(os.environ.get("SNAPSHOT_INTERVAL_MS", "50"))
+# Bitta ko'rinishda keshlanadigan /users sahifalari soni
+VIEW_PAGE_CACHE_SIZE = 256
+# Tayyor javobi keshlanadigan foydalanuvchilar soni - faqat yaqinda o'qilganlar
+# (bitta yozuv ~300 bayt, ya'ni standart chegarada ~30 MB)
+USER_VIEW_CACHE_SIZE = int(os.environ.get("USER_VIEW_CACHE_SIZE", "100000"))
+# Yozuv bo'lmasa ham /stats (faollar soni) shuncha soniyada bir qayta hisoblanadi
+STATS_REFRESH_SECONDS = 1
+
+# Sahifalar uchun kodlashlar, afzalroq birinchi
+ENCODING_PREFERENCE = ("br", "gzip", "deflate")
+
+# /users sahifalash sozlamalari
+USERS_PAGE_SIZE = 100
+MAX_USERS_PAGE = 1000
+NDJSON_CHUNK = 500
+USER_FIELDS = ("username", "score", "joined", "last_active", "version")
+
+# Ombor: "memory" (xotira + data.json/jurnal) yoki "sqlite" (SQLITE_FILE)
+STORE = os.environ.get("STORE", "memory")
+SQLITE_FILE = os.environ.get("SQLITE_FILE", "data.db")
+# uvicorn ishchi jarayonlari soni; 1 dan ko'p bo'lsa holat faqat SQLite orqali bo'lishiladi
+WORKERS = int(os.environ.get("WORKERS", "1"))
+# Xotiradagi ombor bo'laklari soni
+STORE_SHARDS = int(os.environ.get("STORE_SHARDS", "4"))
 # Saqlash fayli
 DATA_FILE = "data.json"
+# Jurnal fayli: har bir o'zgarish alohida qator bo'lib qo'shiladi
+JOURNAL_FILE = "data.journal"
+# Siqishga ajratilgan jurnal: snapshotga qo'shilib bo'lgach o'chiriladi
+COMPACTING_FILE = "data.journal.compacting"
+# Saqlash rejimi: "journal" (jurnal + snapshot) yoki "snapshot" (har safar to'liq fayl)
+STORAGE_MODE = os.environ.get("STORAGE_MODE", "journal")
+# Jurnal shuncha yozuvdan (va foydalanuvchilar sonidan) oshsa yoki shuncha soniya o'tsa snapshotga siqiladi
+COMPACT_THRESHOLD = int(os.environ.get("COMPACT_THRESHOLD", "10000"))
+COMPACT_INTERVAL = float(os.environ.get("COMPACT_INTERVAL", "60"))
+# O'zgarishlar diskka eng ko'pi bilan shuncha millisekundda bir marta yoziladi
+FLUSH_INTERVAL_MS = int(os.environ.get("FLUSH_INTERVAL_MS", "200"))
+# Ishonchlilik rejimi: "always" (har yozishda fsync), "interval" (FSYNC_INTERVAL da bir),
+# "shutdown" (faqat to'xtashda)
+DURABILITY = os.environ.get("DURABILITY", "interval")
+FSYNC_INTERVAL = float(os.environ.get("FSYNC_INTERVAL", "1"))
+
+background_tasks = []
 
 # Modellar
 class UserRegister(BaseModel):
@@ -28,1622 +171,1499 @@ class UserLogin(BaseModel):
 class UserScore(BaseModel):
     username: str
     score: int
+    expected_version: Optional[int] = None  # Berilsa faqat shu versiyadagi yozuv yangilanadi
+
+class TapBatch(BaseModel):
+    count: int
+    window_start: int  # Mijoz vaqti, millisekund
+    window_end: int
+
+class UsernameList(BaseModel):
+    usernames: List[str]
+
+# Reyting indeksi: kengliklari saqlanadigan skip list (order-statistic).
+# Kalit (-ochko, username) - yuqori ochko oldinda, tenglikda username bo'yicha.
+# Yangilash, o'rin aniqlash va indeks bo'yicha olish O(log n), TOP-K o'qish O(log n + k).
+class RankIndex:
+    MAX_LEVEL = 24
+
+    class Node:
+        __slots__ = ("key", "next", "width")
+
+        def __init__(self, key, level: int):
+            self.key = key
+            self.next = [None] * level
+            self.width = [1] * level
+
+    def __init__(self):
+        self.head = RankIndex.Node(None, self.MAX_LEVEL)
+        self.level = 1  # Hozir ishlatilayotgan darajalar soni
+        self.size = 0  # Tugunlar soni
+        self.scores: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __contains__(self, username: str) -> bool:
+        return username in self.scores
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.getrandbits(1):
+            level += 1
+        return level
+
+    def _insert(self, key):
+        level = self._random_level()
+        if level > self.level:
+            # Yangi darajalarda head to'g'ridan-to'g'ri ro'yxat oxiriga ishora qiladi
+            for i in range(self.level, level):
+                self.head.width[i] = self.size + 1
+            self.level = level
+        chain = [None] * self.level
+        steps = [0] * self.level
+        node, pos = self.head, 0
+        for i in range(self.level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                pos += node.width[i]
+                node = node.next[i]
+            chain[i], steps[i] = node, pos
+        new = RankIndex.Node(key, level)
+        for i in range(level):
+            prev = chain[i]
+            new.next[i] = prev.next[i]
+            prev.next[i] = new
+            new.width[i] = prev.width[i] - (pos - steps[i])
+            prev.width[i] = pos - steps[i] + 1
+        for i in range(level, self.level):
+            chain[i].width[i] += 1
+        self.size += 1
+
+    def _remove(self, key):
+        chain = [None] * self.level
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            chain[i] = node
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        level = len(target.next)
+        for i in range(level):
+            chain[i].width[i] += target.width[i] - 1
+            chain[i].next[i] = target.next[i]
+        for i in range(level, self.level):
+            chain[i].width[i] -= 1
+        self.size -= 1
+
+    def _count_before(self, key) -> int:
+        node, pos = self.head, 0
+        for i in range(self.level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                pos += node.width[i]
+                node = node.next[i]
+        return pos
+
+    def _node_at(self, index: int):
+        # index 0 dan boshlanadi; head 0-pozitsiyada turadi
+        node, pos, target = self.head, 0, index + 1
+        for i in range(self.level - 1, -1, -1):
+            while node.next[i] is not None and pos + node.width[i] <= target:
+                pos += node.width[i]
+                node = node.next[i]
+        return node
+
+    def update(self, username: str, score: int):
+        old = self.scores.get(username)
+        if old == score:
+            return
+        if old is not None:
+            self._remove((-old, username))
+        self._insert((-score, username))
+        self.scores[username] = score
+
+    def remove(self, username: str):
+        score = self.scores.pop(username)
+        self._remove((-score, username))
+
+    # Foydalanuvchining 0 dan boshlanuvchi o'rni
+    def rank(self, username: str) -> int:
+        return self._count_before((-self.scores[username], username))
+
+    # Shu ochko va username dan oldin turganlar soni (foydalanuvchi indeksda bo'lmasa ham)
+    def position(self, score: int, username: str) -> int:
+        return self._count_before((-score, username))
+
+    # Kalit atrofi bitta tushishda: (kalitdan oldingilar soni, oldingi `before` ta, kalit va keyingi `after` ta)
+    def around(self, score: int, username: str, before: int, after: int) -> tuple:
+        key = (-score, username)
+        node, pos = self.head, 0
+        for i in range(self.level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                pos += node.width[i]
+                node = node.next[i]
+        # node - kalitdan oldingi oxirgi tugun (yoki head)
+        if before == 1 and pos > 0:
+            above = [(node.key[1], -node.key[0])]
+        else:
+            above = self.range(pos - before, pos) if before else []
+        below = []
+        node = node.next[0]
+        while node is not None and len(below) <= after:
+            below.append((node.key[1], -node.key[0]))
+            node = node.next[0]
+        return pos, above, below
+
+    # [start, stop) oralig'idagi (username, score) juftliklari
+    def range(self, start: int, stop: int) -> List[tuple]:
+        start = max(start, 0)
+        stop = min(stop, len(self.scores))
+        result = []
+        if start >= stop:
+            return result
+        node = self._node_at(start)
+        for _ in range(stop - start):
+            result.append((node.key[1], -node.key[0]))
+            node = node.next[0]
+        return result
+
+    def top(self, k: int) -> List[tuple]:
+        return self.range(0, k)
+
+# Reyting tartibi kaliti: yuqori ochko oldinda, tenglikda username bo'yicha
+def rank_key(row: tuple) -> tuple:
+    return (-row[1], row[0])
+
+# Reyting - ombordagi ochkolardan kelib chiqadigan hosila holat, alohida saqlanmaydi
+LEADERBOARD_SIZE = 10
+# Joriy TOP 10 qatorlari, har qator oxirgi o'zgargan versiya va umumiy versiya
+leaderboard_rows: List[tuple] = []
+leaderboard_row_versions: List[int] = []
+leaderboard_version = 0
+
+# Foydalanuvchi yozuvi: lug'at o'rniga __slots__ - har bir yozuvda atribut lug'ati yo'q.
+# Vaqtlar epoch soniya (int) bo'lib saqlanadi va ISO ko'rinishga faqat API javobida o'tkaziladi.
+# uid - ro'yxatdan o'tish tartibidagi o'rni, username sys.intern qilinadi.
+# 1M foydalanuvchida o'lchangan (tracemalloc, Python 3.11): yozuvning o'zi 80 bayt (avvalgi lug'at
+# ISO qatorlarsiz ~220 bayt, har bir ISO qator yana ~75 bayt); MemoryStore dagi lug'at + tartib
+# ro'yxati + yozuvlar ~150 bayt/foydalanuvchi, RankIndex bilan birga ~430 bayt/foydalanuvchi.
+# O'qish keshi (user_views, ~300 bayt/yozuv) bunga kirmaydi - u USER_VIEW_CACHE_SIZE bilan cheklangan.
+class UserRecord:
+    __slots__ = ("uid", "password", "score", "joined", "last_active", "version")
+
+    def __init__(self, uid: int, password: str, score: int, joined: int, last_active: int, version: int):
+        self.uid = uid
+        self.password = password
+        self.score = score
+        self.joined = joined
+        self.last_active = last_active
+        self.version = version
+
+    # Yozuvchi vazifa handlerga beradigan nusxa - keyingi to'plamlar uni o'zgartirmaydi
+    def copy(self) -> "UserRecord":
+        return UserRecord(self.uid, self.password, self.score, self.joined, self.last_active, self.version)
+
+    # Snapshotdagi ixcham ko'rinish
+    def to_list(self) -> list:
+        return [self.password, self.score, self.joined, self.last_active, self.version]
+
+def now_ts() -> int:
+    return int(time.time())
+
+# Epoch soniyani API dagi ISO ko'rinishga o'tkazish
+def format_ts(ts: int) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+# Eski snapshot/jurnaldagi ISO qatorni ham epoch soniyaga o'tkazish
+def parse_ts(value) -> int:
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(value)
+
+# Faylni atomar yozish: vaqtinchalik fayl + rename
+def write_atomic(path: str, payload: bytes, sync: bool):
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(payload)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    if sync and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+# Foydalanuvchilar ombori. Handlerlar va o'qish ko'rinishi ma'lumotlarga faqat shu interfeys orqali
+# murojaat qiladi. O'zgartiruvchi metodlar yozuv versiyasini oshiradi va yangilangan yozuvni qaytaradi.
+class Store(ABC):
+    # Bir nechta jarayon bitta omborni bo'lishadimi. Unda jarayondagi keshlar (foydalanuvchi
+    # ko'rinishlari, TOP 10 versiyasi, faollik) boshqa ishchilar yozganini bilmaydi va ombordan o'qiladi.
+    shared = False
+
+    @abstractmethod
+    def load(self):
+        ...
+
+    @abstractmethod
+    def get(self, username: str) -> Optional[UserRecord]:
+        ...
+
+    # Foydalanuvchilar soni
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    # Ro'yxatdan o'tish tartibidagi [start, stop) oralig'i: (username, yozuv) juftliklari
+    @abstractmethod
+    def page(self, start: int, stop: int) -> List[tuple]:
+        ...
+
+    # Band username uchun None
+    @abstractmethod
+    def register(self, username: str, password: str, ts: int) -> Optional[UserRecord]:
+        ...
+
+    # Oxirgi faollik vaqtini yangilash (kirishda)
+    @abstractmethod
+    def touch(self, username: str, ts: int) -> UserRecord:
+        ...
+
+    # Ochkoni o'rnatish; yangi ochko joriydan kichik bo'lsa yoki expected_version
+    # berilib yozuv versiyasi boshqa bo'lsa None (tekshirish va yozish bitta amal)
+    @abstractmethod
+    def set_score(self, username: str, score: int, ts: int,
+                  expected_version: Optional[int] = None) -> Optional[UserRecord]:
+        ...
+
+    # Ochkoni oshirish - o'qish va yozish bitta amal
+    @abstractmethod
+    def add_score(self, username: str, delta: int, ts: int) -> UserRecord:
+        ...
+
+    # Berilgan ochkodagi foydalanuvchining 0 dan boshlanuvchi o'rni
+    @abstractmethod
+    def rank(self, username: str, score: int) -> int:
+        ...
+
+    # Reytingdagi [start, stop) oralig'idagi (username, score) juftliklari
+    @abstractmethod
+    def range(self, start: int, stop: int) -> List[tuple]:
+        ...
+
+    # Foydalanuvchi atrofi: (o'rni, oraliq boshi, oldingi `before` ta + o'zi + keyingi `after` ta qator)
+    def neighbors(self, username: str, score: int, before: int, after: int) -> tuple:
+        index = self.rank(username, score)
+        start = max(index - before, 0)
+        return index, start, self.range(start, index + after + 1)
+
+    # Barcha ochkolar yig'indisi
+    @abstractmethod
+    def total_score(self) -> int:
+        ...
+
+    # Har qanday foydalanuvchi o'zgarganda oshadigan hisoblagich - /users ETag i uchun
+    @abstractmethod
+    def changes(self) -> int:
+        ...
+
+    # since dan beri faol bo'lganlarning (username, last_active) juftliklari, eskisi boshida
+    @abstractmethod
+    def active_since(self, since: int) -> List[tuple]:
+        ...
+
+    # O'zgarishlar to'plami: ichidagi yozuvlar reyting indeksiga va diskka oxirida bir marta tushadi
+    @contextmanager
+    def batch(self):
+        yield
+
+    # Yig'ilgan o'zgarishlarni diskka tushirish (fon vazifasi va to'xtashda chaqiriladi)
+    async def flush(self, final: bool = False):
+        pass
+
+    # DURABILITY=always: to'plam natijasi qaytarilishidan oldin diskka tushiriladi, xato chiqarib yuboriladi
+    async def persist_batch(self):
+        pass
+
+    # Davriy xizmat ishlari (jurnalni siqish va h.k.), soniyasiga bir chaqiriladi
+    async def maintain(self):
+        pass
+
+    def close(self):
+        pass
+
+# Jurnal qatorini xom snapshot yozuvlariga qo'llash - MemoryStore.apply_journal_entry bilan bir xil qoidalar.
+# users: username -> [parol, ochko, joined, last_active, versiya]
+def apply_raw_entry(users: dict, entry: list):
+    op, username = entry[0], entry[1]
+    value = users.get(username)
+    if op == "r":
+        if value is None:
+            ts = parse_ts(entry[3])
+            users[username] = [entry[2], 0, ts, ts, 1]
+    elif op == "s" and value is not None:
+        if entry[2] < value[1]:
+            return
+        value[1] = entry[2]
+        value[3] = max(value[3], parse_ts(entry[3]))
+        value[4] += 1
+    elif op == "a" and value is not None:
+        value[3] = max(value[3], parse_ts(entry[2]))
+        value[4] += 1
+
+# Siqish: snapshot fayli + ajratilgan jurnal -> yangi snapshot. Jonli holatga tegmaydi, faqat
+# fayllarni o'qiydi, shuning uchun event loop dan tashqarida (alohida jarayonda) bajariladi.
+def fold_journal(sync: bool):
+    users = {}
+    if os.path.exists(DATA_FILE):
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            for username, value in json.load(f).get('users', {}).items():
+                if not isinstance(value, list):
+                    # Eski format: ISO vaqtli lug'at
+                    value = [value["password"], value.get("score", 0), parse_ts(value["joined"]),
+                             parse_ts(value["last_active"]), value.get("version", 1)]
+                users[username] = value
+    with open(COMPACTING_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            apply_raw_entry(users, entry)
+    data = {'users': users, 'last_updated': datetime.now().isoformat()}
+    write_atomic(DATA_FILE, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), sync)
+    os.remove(COMPACTING_FILE)
+
+# Fork qilingan jarayonda: ota jarayondan qolgan obyektlar GC tomonidan aylanib chiqilmasin
+# (aks holda copy-on-write sahifalar behuda nusxalanadi)
+def fold_journal_process(sync: bool):
+    gc.freeze()
+    fold_journal(sync)
+
+# Siqishni alohida jarayonda bajarish: json kodlash GIL ni qo'yib yubormaydi, shuning uchun oqim
+# event loop ni baribir to'xtatib qo'yadi. fork bo'lmagan platformada oqimda bajariladi.
+async def run_fold_journal(sync: bool):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        await asyncio.to_thread(fold_journal, sync)
+        return
+    process = multiprocessing.get_context("fork").Process(target=fold_journal_process, args=(sync,), daemon=True)
+    process.start()
+    await asyncio.to_thread(process.join)
+    if process.exitcode != 0:
+        raise RuntimeError(f"siqish jarayoni {process.exitcode} kodi bilan tugadi")
+
+# Xotiradagi ombor bo'lagi: o'z foydalanuvchilari, reyting indeksi, qulfi va versiyasi bor.
+# Turli bo'laklardagi foydalanuvchilarni yangilash bir-birini kutmaydi (thread pool da ham).
+class Shard:
+    __slots__ = ("users", "index", "lock", "version", "total_taps")
+
+    def __init__(self):
+        self.users: Dict[str, UserRecord] = {}
+        self.index = RankIndex()
+        self.lock = threading.Lock()
+        self.version = 0  # Bo'lakdagi har bir o'zgarishda oshadi
+        self.total_taps = 0
+
+# Xotiradagi ombor: yozuvlar username xeshi bo'yicha STORE_SHARDS ta bo'lakka bo'lingan,
+# diskka jurnal + snapshot (yoki har safar to'liq snapshot) ko'rinishida yoziladi.
+# Umumiy reyting bo'laklardagi o'rinlar yig'indisi, TOP-K bo'laklar TOP-K larining birlashmasi.
+class MemoryStore(Store):
+    def __init__(self, shards: int = 1):
+        self.shards = [Shard() for _ in range(max(shards, 1))]
+        self.order: List[str] = []  # Ro'yxatdan o'tish tartibi - sahifalash uchun barqaror tartib
+        self.order_lock = threading.Lock()  # Faqat ro'yxatdan o'tishda - uid berish uchun
+        # To'plam davomida indeksga yozilmagan ochkolar: username -> (bo'lak, ochko)
+        self.deferred: Optional[Dict[str, tuple]] = None
+        # Saqlash holati
+        self.journal_file = None
+        self.journal_entries = 0
+        # Hali diskka yozilmagan jurnal qatorlari. deque ning append/popleft amallari oqimlar
+        # orasida xavfsiz, shuning uchun yozuvchilar umumiy qulf olmaydi.
+        self.pending_entries = deque()
+        self.dirty = False  # Snapshot rejimida saqlanmagan o'zgarish bor
+        self.last_compaction = time.monotonic()
+        self.compacting = False  # Siqish jarayoni ishlayapti
+        self.last_fsync = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def shard_for(self, username: str) -> Shard:
+        return self.shards[hash(username) % len(self.shards)]
+
+    # Bir foydalanuvchining to'plamdagi bir nechta yangilanishi indeksga bitta yangilanish bo'lib tushadi
+    @contextmanager
+    def batch(self):
+        self.deferred = {}
+        try:
+            yield
+        finally:
+            deferred, self.deferred = self.deferred, None
+            for username, (shard, score) in deferred.items():
+                with shard.lock:
+                    shard.index.update(username, score)
+
+    # Reyting indeksini yangilash - to'plam ichida oxiriga qoldiriladi (bo'lak qulfi ostida chaqiriladi)
+    def index_update(self, shard: Shard, username: str, score: int):
+        if self.deferred is not None:
+            self.deferred[username] = (shard, score)
+        else:
+            shard.index.update(username, score)
+
+    def get(self, username: str) -> Optional[UserRecord]:
+        return self.shard_for(username).users.get(username)
+
+    def count(self) -> int:
+        return len(self.order)
+
+    def page(self, start: int, stop: int) -> List[tuple]:
+        return [(username, self.get(username)) for username in self.order[start:stop]]
+
+    def register(self, username: str, password: str, ts: int) -> Optional[UserRecord]:
+        shard = self.shard_for(username)
+        with shard.lock:
+            if username in shard.users:
+                return None
+            record = self.add_user(shard, username, password, ts)
+            self.record_change("r", username, password, ts)
+            return record
+
+    def touch(self, username: str, ts: int) -> UserRecord:
+        shard = self.shard_for(username)
+        with shard.lock:
+            record = shard.users[username]
+            record.last_active = ts
+            record.version += 1
+            shard.version += 1
+            self.record_change("a", username, ts)
+            return record
+
+    def set_score(self, username: str, score: int, ts: int,
+                  expected_version: Optional[int] = None) -> Optional[UserRecord]:
+        shard = self.shard_for(username)
+        with shard.lock:
+            record = shard.users[username]
+            if score < record.score:
+                return None
+            if expected_version is not None and record.version != expected_version:
+                return None
+            self.apply_score(shard, username, record, score, ts)
+            return record
+
+    def add_score(self, username: str, delta: int, ts: int) -> UserRecord:
+        shard = self.shard_for(username)
+        with shard.lock:
+            record = shard.users[username]
+            self.apply_score(shard, username, record, record.score + delta, ts)
+            return record
+
+    def rank(self, username: str, score: int) -> int:
+        index = 0
+        for shard in self.shards:
+            with shard.lock:
+                index += shard.index.position(score, username)
+        return index
+
+    # Bo'laklarning TOP-stop ro'yxatlarini birlashtirib kesish - TOP ro'yxatlar uchun mo'ljallangan
+    def range(self, start: int, stop: int) -> List[tuple]:
+        start = max(start, 0)
+        if start >= stop:
+            return []
+        tops = []
+        for shard in self.shards:
+            with shard.lock:
+                tops.append(shard.index.top(stop))
+        if len(tops) == 1:
+            return tops[0][start:]
+        # Ro'yxatlar qisqa (bo'laklar * stop) - C dagi sort heapq.merge generatoridan tezroq
+        return sorted(itertools.chain.from_iterable(tops), key=rank_key)[start:stop]
+
+    # Har bo'lakdan kalit atrofidagi qo'shnilar olinib birlashtiriladi - chuqur o'rinlarda ham O(bo'laklar * (log n + k))
+    def neighbors(self, username: str, score: int, before: int, after: int) -> tuple:
+        index = 0
+        above, below = [], []
+        for shard in self.shards:
+            with shard.lock:
+                # O'z bo'lagida below foydalanuvchining o'zidan, boshqalarida undan keyingi kalitdan boshlanadi
+                position, shard_above, shard_below = shard.index.around(score, username, before, after)
+            index += position
+            above.append(shard_above)
+            below.append(shard_below)
+        above = sorted(itertools.chain.from_iterable(above), key=rank_key)[-before:] if before else []
+        below = sorted(itertools.chain.from_iterable(below), key=rank_key)[:after + 1]
+        return index, index - len(above), above + below
+
+    def total_score(self) -> int:
+        return sum(shard.total_taps for shard in self.shards)
+
+    def changes(self) -> int:
+        return sum(shard.version for shard in self.shards)
+
+    def active_since(self, since: int) -> List[tuple]:
+        active = [(username, record.last_active) for shard in self.shards
+                  for username, record in shard.users.items() if record.last_active >= since]
+        active.sort(key=lambda item: item[1])
+        return active
+
+    # Bo'lak qulfi ostida chaqiriladi
+    def add_user(self, shard: Shard, username: str, password: str, joined: int) -> UserRecord:
+        username = sys.intern(username)
+        with self.order_lock:
+            record = UserRecord(len(self.order), password, 0, joined, joined, 1)
+            self.order.append(username)
+        shard.users[username] = record
+        self.index_update(shard, username, 0)
+        shard.version += 1
+        return record
+
+    # Bo'lak qulfi ostida chaqiriladi
+    def apply_score(self, shard: Shard, username: str, record: UserRecord, score: int, ts: int):
+        shard.total_taps += score - record.score
+        record.score = score
+        record.last_active = ts
+        record.version += 1
+        shard.version += 1
+        self.index_update(shard, username, score)
+        self.record_change("s", username, score, ts)
+
+    # Jurnal yozuvini xotiradagi ma'lumotlarga qo'llash.
+    # Yozuvlar qayta qo'llanganda ham natija o'zgarmaydi (ochko faqat o'sadi),
+    # shuning uchun snapshot yozilib jurnal hali tozalanmagan holat ham xavfsiz.
+    def apply_journal_entry(self, entry: list):
+        op, username = entry[0], entry[1]
+        shard = self.shard_for(username)
+        record = shard.users.get(username)
+        if op == "r":
+            if record is None:
+                self.add_user(shard, username, entry[2], parse_ts(entry[3]))
+        elif op == "s" and record is not None:
+            if entry[2] < record.score:
+                return
+            record.score = entry[2]
+            record.last_active = max(record.last_active, parse_ts(entry[3]))
+            record.version += 1
+            shard.index.update(username, entry[2])
+        elif op == "a" and record is not None:
+            record.last_active = max(record.last_active, parse_ts(entry[2]))
+            record.version += 1
+
+    # Ma'lumotlarni yuklash: snapshot + jurnal qoldig'i
+    def load(self):
+        self.shards = [Shard() for _ in self.shards]
+        self.order = []
+        try:
+            if os.path.exists(DATA_FILE):
+                with open(DATA_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # JSON obyekt tartibi saqlanadi - ro'yxatdan o'tish tartibi bilan bir xil
+                for username, value in data.get('users', {}).items():
+                    username = sys.intern(username)
+                    if isinstance(value, list):
+                        record = UserRecord(len(self.order), *value)
+                    else:
+                        # Eski format: ISO vaqtli lug'at
+                        record = UserRecord(len(self.order), value["password"], value.get("score", 0),
+                                            parse_ts(value["joined"]), parse_ts(value["last_active"]),
+                                            value.get("version", 1))
+                    self.shard_for(username).users[username] = record
+                    self.order.append(username)
+        except Exception as e:
+            print(f"Ma'lumotlarni yuklashda xatolik: {e}")
+        
+        # Reyting indekslarini snapshotdan qayta qurish
+        for shard in self.shards:
+            for username, record in shard.users.items():
+                shard.index.update(username, record.score)
+        
+        # Siqish tugamay to'xtagan bo'lsa ajratilgan jurnal asosiy jurnaldan oldin qo'llanadi
+        self.journal_entries = 0
+        for path in (COMPACTING_FILE, JOURNAL_FILE):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # Oxirgi qator yarim yozilgan bo'lishi mumkin
+                            continue
+                        self.apply_journal_entry(entry)
+                        self.journal_entries += 1
+            except Exception as e:
+                print(f"Jurnalni o'qishda xatolik: {e}")
+        
+        # Hisoblagich faqat ishga tushishda bir marta to'liq hisoblanadi
+        for shard in self.shards:
+            shard.total_taps = sum(record.score for record in shard.users.values())
 
-# Ma'lumotlarni yuklash
-def load_data():
-    global users_db, leaderboard_data
-    try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                users_db = data.get('users', {})
-                leaderboard_data = data.get('leaderboard', [])
-    except Exception as e:
-        print(f"Ma'lumotlarni yuklashda xatolik: {e}")
-
-# Ma'lumotlarni saqlash
-def save_data():
-    try:
+    # Snapshotni baytlarga aylantirish (snapshot rejimida, event loop ichida, ma'lumotlar izchil bo'lishi uchun)
+    def serialize(self) -> bytes:
         data = {
-            'users': users_db,
-            'leaderboard': leaderboard_data,
+            'users': {username: self.get(username).to_list() for username in self.order},
             'last_updated': datetime.now().isoformat()
         }
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Ma'lumotlarni saqlashda xatolik: {e}")
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    # Jurnal qatorlarini faylga qo'shish (alohida oqimda ishlaydi)
+    def write_journal_lines(self, lines: list, sync: bool):
+        if self.journal_file is None:
+            self.journal_file = open(JOURNAL_FILE, 'a', encoding='utf-8')
+        self.journal_file.write("".join(lines))
+        self.journal_file.flush()
+        if sync:
+            os.fsync(self.journal_file.fileno())
+
+    # Jurnalni siqishga ajratish: qolgan qatorlar yozilib, fayl COMPACTING_FILE ga o'tadi va keyingi
+    # yozuvlar yangi jurnalga tushadi. Oldingi siqish tugamagan bo'lsa jurnal unga qo'shiladi.
+    # (alohida oqimda ishlaydi)
+    def rotate_journal(self, lines: list, sync: bool):
+        self.write_journal_lines(lines, sync)
+        self.journal_file.close()
+        self.journal_file = None
+        if not os.path.exists(COMPACTING_FILE):
+            os.replace(JOURNAL_FILE, COMPACTING_FILE)
+        else:
+            with open(JOURNAL_FILE, 'rb') as src, open(COMPACTING_FILE, 'ab') as dst:
+                shutil.copyfileobj(src, dst)
+                if sync:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+        open(JOURNAL_FILE, 'w', encoding='utf-8').close()
+
+    # O'zgarishni qayd etish: handler faqat belgilab qaytadi, diskka fon vazifasi yozadi
+    def record_change(self, *entry):
+        if STORAGE_MODE == "journal":
+            self.pending_entries.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n")
+        else:
+            self.dirty = True
+
+    # Yig'ilgan qatorlarni navbatdan olish - shu payt qo'shilayotganlari keyingi safarga qoladi
+    def take_pending(self) -> list:
+        return [self.pending_entries.popleft() for _ in range(len(self.pending_entries))]
+
+    # fsync kerakmi - ishonchlilik rejimiga qarab
+    def should_fsync(self, final: bool = False) -> bool:
+        if DURABILITY == "always" or final:
+            return True
+        if DURABILITY == "interval":
+            return time.monotonic() - self.last_fsync >= FSYNC_INTERVAL
+        return False
+
+    # Yig'ilgan o'zgarishlarni bitta yozuv bilan diskka tushirish
+    async def flush(self, final: bool = False):
+        async with self.lock:
+            try:
+                await self.write_pending(self.should_fsync(final), final)
+            except Exception as e:
+                print(f"Ma'lumotlarni saqlashda xatolik: {e}")
+
+    # Qulf ostida chaqiriladi; xato bo'lsa yozilmagan o'zgarishlar keyingi urinishga qoladi
+    async def write_pending(self, sync: bool, final: bool = False):
+        if STORAGE_MODE == "journal":
+            if not self.pending_entries and not final:
+                return
+            lines = self.take_pending()
+            try:
+                await asyncio.to_thread(self.write_journal_lines, lines, sync)
+            except Exception:
+                self.pending_entries.extendleft(reversed(lines))
+                raise
+            self.journal_entries += len(lines)
+        else:
+            if not self.dirty:
+                return
+            self.dirty = False
+            payload = self.serialize()
+            try:
+                await asyncio.to_thread(write_atomic, DATA_FILE, payload, sync)
+            except Exception:
+                self.dirty = True
+                raise
+        if sync:
+            self.last_fsync = time.monotonic()
+
+    # fsync kutilayotganda navbatga tushgan yozuvlar keyingi to'plamga yig'iladi (guruhli commit)
+    async def persist_batch(self):
+        if DURABILITY != "always":
+            return
+        async with self.lock:
+            await self.write_pending(True)
+
+    # Jurnalni snapshotga siqish. Qulf ostida faqat jurnal ajratiladi; snapshot bilan birlashtirish
+    # fayllardan alohida jarayonda bo'ladi - jonli holat event loop da seriyalanmaydi,
+    # bu orada yangi o'zgarishlar yangi jurnalga yozilaveradi.
+    async def compact(self):
+        if self.compacting:
+            return
+        self.compacting = True
+        try:
+            async with self.lock:
+                self.last_compaction = time.monotonic()
+                lines = self.take_pending()
+                try:
+                    await asyncio.to_thread(self.rotate_journal, lines, DURABILITY != "shutdown")
+                except Exception as e:
+                    # Jurnalga yozilmaguncha qatorlarni yo'qotmaymiz
+                    self.pending_entries.extendleft(reversed(lines))
+                    print(f"Jurnalni siqishda xatolik: {e}")
+                    return
+                self.journal_entries = 0
+            # Muvaffaqiyatsiz bo'lsa ajratilgan jurnal qoladi va keyingi siqishda yana birlashtiriladi
+            await run_fold_journal(DURABILITY != "shutdown")
+        except Exception as e:
+            print(f"Jurnalni siqishda xatolik: {e}")
+        finally:
+            self.compacting = False
+
+    # Jurnal chegaradan va foydalanuvchilar sonidan oshsa (siqish narxi yozuvlar orasida taqsimlanadi)
+    # yoki shuncha vaqt o'tsa snapshotga siqiladi
+    async def maintain(self):
+        if STORAGE_MODE != "journal" or self.journal_entries == 0:
+            return
+        if self.journal_entries >= max(COMPACT_THRESHOLD, self.count()) \
+                or time.monotonic() - self.last_compaction >= COMPACT_INTERVAL:
+            await self.compact()
+
+# SQLite ombori: WAL rejimi, har yozuv butun faylni emas faqat o'zgargan sahifalarni yozadi.
+# Reyting (score DESC, username) indeksidan o'qiladi. So'rov matnlari o'zgarmas, shuning uchun
+# sqlite3 ularni ulanish keshida tayyorlangan holda saqlaydi.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    score INTEGER NOT NULL DEFAULT 0,
+    joined INTEGER NOT NULL,
+    last_active INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS users_rank ON users (score DESC, username);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), taps INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals (id, taps) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS users_taps_insert AFTER INSERT ON users
+BEGIN UPDATE totals SET taps = taps + NEW.score WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS users_taps_update AFTER UPDATE OF score ON users
+BEGIN UPDATE totals SET taps = taps + NEW.score - OLD.score WHERE id = 0; END;
+CREATE INDEX IF NOT EXISTS users_active ON users (last_active);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('changes', 0), ('leaderboard', 0);
+CREATE TRIGGER IF NOT EXISTS users_changes_insert AFTER INSERT ON users
+BEGIN UPDATE counters SET value = value + 1 WHERE name = 'changes'; END;
+CREATE TRIGGER IF NOT EXISTS users_changes_update AFTER UPDATE ON users
+BEGIN UPDATE counters SET value = value + 1 WHERE name = 'changes'; END;
+CREATE TABLE IF NOT EXISTS top_rows (
+    position INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tap_windows (
+    username TEXT PRIMARY KEY,
+    clock_offset INTEGER NOT NULL,
+    last_end INTEGER NOT NULL,
+    claimed_at INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS score_counts (score INTEGER PRIMARY KEY, users INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS score_buckets (bucket INTEGER PRIMARY KEY, users INTEGER NOT NULL);
+"""
+# O'rin hisoblagichlari: har ochkoda va har 2^RANK_BUCKET_SHIFT kenglikdagi oraliqda nechta foydalanuvchi.
+# O'rin = yuqoridagi oraliqlar yig'indisi + oraliq ichidagi ochkolar yig'indisi + tenglikdagilar, ya'ni
+# yuqoridagi foydalanuvchilar soniga emas, eng katta ochko / 2^SHIFT + 2^SHIFT qatorga bog'liq.
+# Trigger bilan yuritiladi, shuning uchun barcha ishchilar uchun bir xil.
+RANK_BUCKET_SHIFT = 10
+SQLITE_RANK_TRIGGERS = [
+    f"""CREATE TRIGGER users_rank_insert AFTER INSERT ON users BEGIN
+    INSERT INTO score_counts (score, users) VALUES (NEW.score, 1)
+        ON CONFLICT (score) DO UPDATE SET users = users + 1;
+    INSERT INTO score_buckets (bucket, users) VALUES (NEW.score >> {RANK_BUCKET_SHIFT}, 1)
+        ON CONFLICT (bucket) DO UPDATE SET users = users + 1;
+END""",
+    f"""CREATE TRIGGER users_rank_update AFTER UPDATE OF score ON users WHEN NEW.score != OLD.score BEGIN
+    UPDATE score_counts SET users = users - 1 WHERE score = OLD.score;
+    DELETE FROM score_counts WHERE score = OLD.score AND users = 0;
+    INSERT INTO score_counts (score, users) VALUES (NEW.score, 1)
+        ON CONFLICT (score) DO UPDATE SET users = users + 1;
+    UPDATE score_buckets SET users = users - 1 WHERE bucket = OLD.score >> {RANK_BUCKET_SHIFT};
+    DELETE FROM score_buckets WHERE bucket = OLD.score >> {RANK_BUCKET_SHIFT} AND users = 0;
+    INSERT INTO score_buckets (bucket, users) VALUES (NEW.score >> {RANK_BUCKET_SHIFT}, 1)
+        ON CONFLICT (bucket) DO UPDATE SET users = users + 1;
+END""",
+]
+# rowid 1 dan ketma-ket beriladi (o'chirish yo'q), shuning uchun rowid - 1 ro'yxatdan o'tish tartibi
+SQLITE_RECORD = "rowid - 1, password, score, joined, last_active, version"
+
+class SqliteStore(Store):
+    def __init__(self, path: str, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        self.db = None
+        self.batching = False
+        self.last_tap_cleanup = 0.0
+
+    def load(self):
+        # NDJSON generatori threadpool da ishlaydi; ulanish serialized rejimda, shuning uchun bo'lishish xavfsiz
+        self.db = sqlite3.connect(self.path, cached_statements=256, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # WAL da NORMAL commit paytida fsync qilmaydi; "always" rejimida har commit diskka tushadi
+        self.db.execute(f"PRAGMA synchronous={'FULL' if DURABILITY == 'always' else 'NORMAL'}")
+        # Boshqa ishchi yozayotgan bo'lsa xato o'rniga kutish
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(SQLITE_SCHEMA)
+        self.ensure_rank_counts()
+        self.ensure_tap_window_claims()
+        if self.count() == 0 and any(os.path.exists(path) for path in (DATA_FILE, JOURNAL_FILE, COMPACTING_FILE)):
+            self.import_files()
+
+    # claimed_at ustunisiz yaratilgan tap_windows ga ustun qo'shiladi. Eski qatorlar 0 oladi, ya'ni
+    # bo'sh turgan hisoblanadi - keyingi to'plam ularni birinchi to'plam sifatida qayta yozadi
+    def ensure_tap_window_claims(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(tap_windows)")]
+            if "claimed_at" not in columns:
+                self.db.execute("ALTER TABLE tap_windows ADD COLUMN claimed_at INTEGER NOT NULL DEFAULT 0")
+            self.db.execute("CREATE INDEX IF NOT EXISTS tap_windows_claimed ON tap_windows (claimed_at)")
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    # Hisoblagichlarsiz yaratilgan bazada triggerlar va hisoblagichlar bitta tranzaksiyada qo'shiladi -
+    # parallel ishga tushayotgan ishchi yoki yozuv oraliqda qolib ketmaydi
+    def ensure_rank_counts(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            exists = self.db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'users_rank_insert'"
+            ).fetchone()
+            if not exists:
+                for statement in SQLITE_RANK_TRIGGERS:
+                    self.db.execute(statement)
+                self.db.execute("DELETE FROM score_counts")
+                self.db.execute("DELETE FROM score_buckets")
+                self.db.execute("INSERT INTO score_counts (score, users) SELECT score, COUNT(*) FROM users GROUP BY score")
+                self.db.execute(
+                    "INSERT INTO score_buckets (bucket, users) SELECT score >> ?, SUM(users) FROM score_counts GROUP BY 1",
+                    (RANK_BUCKET_SHIFT,)
+                )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    # Birinchi ishga tushishda data.json va jurnaldagi foydalanuvchilarni ko'chirish
+    def import_files(self):
+        legacy = MemoryStore()
+        legacy.load()
+        self.db.executemany(
+            "INSERT INTO users (username, password, score, joined, last_active, version) VALUES (?, ?, ?, ?, ?, ?)",
+            [(username, *legacy.get(username).to_list()) for username in legacy.order]
+        )
+        self.db.commit()
+        print(f"{len(legacy.order)} ta foydalanuvchi {self.path} ga ko'chirildi")
+
+    # Commit darhol kerakmi: "always" rejimida va shared rejimda
+    # (ochiq tranzaksiya boshqa ishchilarning yozishini to'sib qo'yadi), aks holda fon vazifasida guruhlab
+    def commit_now(self) -> bool:
+        return DURABILITY == "always" or self.shared
+
+    # O'zgartiruvchi so'rov; to'plam ichida commit to'plam oxirida bitta bo'ladi
+    def write(self, sql: str, params: tuple) -> Optional[UserRecord]:
+        rows = self.db.execute(sql, params).fetchall()
+        if not self.batching and self.commit_now():
+            self.db.commit()
+        return UserRecord(*rows[0]) if rows else None
+
+    @contextmanager
+    def batch(self):
+        self.batching = True
+        try:
+            yield
+        finally:
+            self.batching = False
+            if self.commit_now() and self.db.in_transaction:
+                try:
+                    self.db.commit()
+                except sqlite3.Error:
+                    self.db.rollback()
+                    raise
+
+    def get(self, username: str) -> Optional[UserRecord]:
+        row = self.db.execute(f"SELECT {SQLITE_RECORD} FROM users WHERE username = ?", (username,)).fetchone()
+        return UserRecord(*row) if row else None
+
+    def count(self) -> int:
+        # O'chirish yo'q - eng katta rowid soniga teng va COUNT(*) kabi butun jadvalni o'qimaydi
+        return self.db.execute("SELECT MAX(rowid) FROM users").fetchone()[0] or 0
+
+    def page(self, start: int, stop: int) -> List[tuple]:
+        rows = self.db.execute(
+            f"SELECT username, {SQLITE_RECORD} FROM users WHERE rowid > ? AND rowid <= ? ORDER BY rowid",
+            (start, stop)
+        )
+        return [(row[0], UserRecord(*row[1:])) for row in rows]
+
+    def register(self, username: str, password: str, ts: int) -> Optional[UserRecord]:
+        return self.write(
+            "INSERT INTO users (username, password, score, joined, last_active, version) VALUES (?, ?, 0, ?, ?, 1) "
+            f"ON CONFLICT (username) DO NOTHING RETURNING {SQLITE_RECORD}",
+            (username, password, ts, ts)
+        )
+
+    def touch(self, username: str, ts: int) -> UserRecord:
+        return self.write(
+            f"UPDATE users SET last_active = ?, version = version + 1 WHERE username = ? RETURNING {SQLITE_RECORD}",
+            (ts, username)
+        )
+
+    def set_score(self, username: str, score: int, ts: int,
+                  expected_version: Optional[int] = None) -> Optional[UserRecord]:
+        return self.write(
+            "UPDATE users SET score = ?, last_active = ?, version = version + 1 "
+            f"WHERE username = ? AND score <= ? AND (? IS NULL OR version = ?) RETURNING {SQLITE_RECORD}",
+            (score, ts, username, score, expected_version, expected_version)
+        )
+
+    def add_score(self, username: str, delta: int, ts: int) -> UserRecord:
+        return self.write(
+            "UPDATE users SET score = score + ?, last_active = ?, version = version + 1 "
+            f"WHERE username = ? RETURNING {SQLITE_RECORD}",
+            (delta, ts, username)
+        )
+
+    def rank(self, username: str, score: int) -> int:
+        bucket = score >> RANK_BUCKET_SHIFT
+        # Faqat tenglikdagilar indeks oralig'i bo'yicha sanaladi: bir ochkoda ko'p o'yinchi bo'lsa
+        # (masalan 0 dagi yangi foydalanuvchilar) narx ulardan oldinda turganlar soniga bog'liq bo'lib qoladi
+        return self.db.execute(
+            "SELECT (SELECT COALESCE(SUM(users), 0) FROM score_buckets WHERE bucket > ?) + "
+            "(SELECT COALESCE(SUM(users), 0) FROM score_counts WHERE score > ? AND score < ?) + "
+            "(SELECT COUNT(*) FROM users WHERE score = ? AND username < ?)",
+            (bucket, score, (bucket + 1) << RANK_BUCKET_SHIFT, score, username)
+        ).fetchone()[0]
+
+    # start-o'rindagi foydalanuvchi ochkosi va undan yuqori ochkolilar soni; start hammadan ko'p bo'lsa None
+    def locate(self, start: int) -> Optional[tuple]:
+        above = 0
+        for bucket, users in self.db.execute("SELECT bucket, users FROM score_buckets ORDER BY bucket DESC"):
+            if above + users > start:
+                break
+            above += users
+        else:
+            return None
+        rows = self.db.execute(
+            "SELECT score, users FROM score_counts WHERE score >= ? AND score < ? ORDER BY score DESC",
+            (bucket << RANK_BUCKET_SHIFT, (bucket + 1) << RANK_BUCKET_SHIFT)
+        )
+        for score, users in rows:
+            if above + users > start:
+                return score, above
+            above += users
+        return None
+
+    def range(self, start: int, stop: int) -> List[tuple]:
+        start = max(start, 0)
+        if start >= stop:
+            return []
+        if start == 0:
+            return self.db.execute(
+                "SELECT username, score FROM users ORDER BY score DESC, username LIMIT ?", (stop,)
+            ).fetchall()
+        # OFFSET butun yuqori qismni aylanib chiqmasligi uchun avval hisoblagichlardan ochko topiladi,
+        # OFFSET faqat shu ochkodagi tenglikdagilar ichida qoladi
+        found = self.locate(start)
+        if found is None:
+            return []
+        score, above = found
+        return self.db.execute(
+            "SELECT username, score FROM users WHERE score <= ? ORDER BY score DESC, username LIMIT ? OFFSET ?",
+            (score, stop - start, start - above)
+        ).fetchall()
+
+    def total_score(self) -> int:
+        return self.db.execute("SELECT taps FROM totals WHERE id = 0").fetchone()[0]
+
+    def changes(self) -> int:
+        return self.db.execute("SELECT value FROM counters WHERE name = 'changes'").fetchone()[0]
+
+    # Faqat shared rejim uchun: to'plam oynasini tekshirish va yozish bitta amal. Qabul qilinsa None,
+    # aks holda saqlangan (soat farqi, oyna oxiri) - rad etish sababini aniqlash uchun.
+    # Bosishlar soni oldingi oyna oxiridan beri o'tgan vaqtga sig'ishi kerak (soniyasiga rate ta).
+    # TAP_WINDOW_IDLE_SECONDS dan beri to'plam kelmagan oyna xotiradagidek unutiladi: to'plam birinchi
+    # deb qabul qilinadi va soat farqi qayta olinadi (boshqa qurilma yoki to'g'rilangan soat uchun).
+    def claim_tap_window(self, username: str, start: int, end: int, count: int, rate: int,
+                         now_ms: int, limit_ms: int) -> Optional[tuple]:
+        idle_before = now_ms - int(TAP_WINDOW_IDLE_SECONDS * 1000)
+        claimed = self.db.execute(
+            "INSERT INTO tap_windows (username, clock_offset, last_end, claimed_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET "
+            "clock_offset = CASE WHEN claimed_at < ? THEN excluded.clock_offset ELSE clock_offset END, "
+            "last_end = excluded.last_end, claimed_at = excluded.claimed_at "
+            "WHERE claimed_at < ? OR (last_end < ? AND ? * 1000 <= (excluded.last_end - last_end) * ? "
+            "AND excluded.last_end + clock_offset <= ?) RETURNING 1",
+            (username, now_ms - end, end, now_ms, idle_before, idle_before, start, count, rate, limit_ms)
+        ).fetchall()
+        if not self.batching and self.commit_now():
+            self.db.commit()
+        if claimed:
+            return None
+        return self.db.execute(
+            "SELECT clock_offset, last_end FROM tap_windows WHERE username = ?", (username,)
+        ).fetchone()
+
+    def active_since(self, since: int) -> List[tuple]:
+        return self.db.execute(
+            "SELECT username, last_active FROM users WHERE last_active >= ? ORDER BY last_active", (since,)
+        ).fetchall()
+
+    # Shared rejimda bo'sh turgan tap_windows qatorlari o'chiriladi - jadval faqat faol o'yinchilarni saqlaydi
+    async def maintain(self):
+        if not self.shared or time.monotonic() - self.last_tap_cleanup < TAP_WINDOW_IDLE_SECONDS:
+            return
+        self.last_tap_cleanup = time.monotonic()
+        try:
+            idle_before = int(time.time() * 1000) - int(TAP_WINDOW_IDLE_SECONDS * 1000)
+            self.db.execute("DELETE FROM tap_windows WHERE claimed_at < ?", (idle_before,))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print(f"Bosish oynalarini tozalashda xatolik: {e}")
+
+    # Faqat shared rejim uchun (Store interfeysida yo'q): shu vaqtdan beri faol bo'lganlar soni
+    def active_count(self, since: int) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM users WHERE last_active >= ?", (since,)).fetchone()[0]
+
+    def stored_leaderboard(self) -> tuple:
+        version = self.db.execute("SELECT value FROM counters WHERE name = 'leaderboard'").fetchone()[0]
+        stored = self.db.execute("SELECT username, score, version FROM top_rows ORDER BY position").fetchall()
+        return version, [(username, score) for username, score, _ in stored], [row[2] for row in stored]
+
+    # Faqat shared rejim uchun: TOP qatorlarini ombordagi versiya bilan moslash - (versiya, qatorlar,
+    # qator versiyalari). Versiya barcha ishchilar uchun bitta bo'lishi kerak.
+    def sync_leaderboard(self, size: int) -> tuple:
+        version, stored, versions = self.stored_leaderboard()
+        if self.range(0, size) == stored:
+            return version, stored, versions
+        # Yangi versiyani faqat bitta ishchi yozadi, qolganlari qulf ostida qayta tekshirib tayyorini oladi
+        if self.db.in_transaction:
+            self.db.commit()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            version, stored, versions = self.stored_leaderboard()
+            rows = self.range(0, size)
+            if rows != stored:
+                version += 1
+                versions = next_row_versions(stored, versions, rows, version)
+                self.db.execute("DELETE FROM top_rows")
+                self.db.executemany(
+                    "INSERT INTO top_rows (position, username, score, version) VALUES (?, ?, ?, ?)",
+                    [(index, username, score, versions[index]) for index, (username, score) in enumerate(rows)]
+                )
+                self.db.execute("UPDATE counters SET value = ? WHERE name = 'leaderboard'", (version,))
+                stored = rows
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return version, stored, versions
+
+    async def flush(self, final: bool = False):
+        if self.db is not None and self.db.in_transaction:
+            try:
+                self.db.commit()
+            except Exception as e:
+                print(f"Ma'lumotlarni saqlashda xatolik: {e}")
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+def create_store() -> Store:
+    if STORE == "sqlite":
+        return SqliteStore(SQLITE_FILE, shared=WORKERS > 1)
+    return MemoryStore(STORE_SHARDS)
+
+store = create_store()
+
+# O'zgartirishlar navbati (ishga tushishda yaratiladi) va bitta to'plamdagi eng ko'p o'zgartirishlar
+write_queue: Optional[asyncio.Queue] = None
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "256"))
+
+# Fon vazifasi: o'zgarishlarni vaqti-vaqti bilan diskka tushirish
+async def flusher_loop():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_MS / 1000)
+        # To'xtatilganda yozish yarmida uzilib qolmasligi uchun shield
+        await asyncio.shield(store.flush())
+
+# Fon vazifasi: omborning davriy xizmat ishlari (jurnalni siqish)
+async def maintenance_loop():
+    while True:
+        await asyncio.sleep(1)
+        await asyncio.shield(store.maintain())
+
+# CSS ni kichraytirish: izohlar va ortiqcha bo'shliqlarni olib tashlash
+def minify_css(text: str) -> str:
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+# JS ni ehtiyotkorlik bilan kichraytirish: faqat chekinish, bo'sh qatorlar va to'liq qatorli
+# izohlar olib tashlanadi. Qator oxirlari saqlanadi, shuning uchun nuqtali vergul qoidalari buzilmaydi.
+def minify_js(text: str) -> str:
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
+
+# Assetni kontent xeshi bilan static/ ga yozish (yonida .gz varianti ham), URL ni qaytaradi
+def write_asset(name: str, ext: str, content: str) -> str:
+    body = content.encode('utf-8')
+    filename = f"{name}.{hashlib.sha256(body).hexdigest()[:12]}.{ext}"
+    path = os.path.join(STATIC_DIR, filename)
+    if not os.path.exists(path):
+        write_atomic(path + ".gz", gzip.compress(body, compresslevel=9, mtime=0), False)
+        write_atomic(path, body, False)
+    # Eski xeshli fayllarni tozalash
+    for old in os.listdir(STATIC_DIR):
+        stale = old.endswith(f".{ext}") or old.endswith(f".{ext}.gz")
+        if old.startswith(f"{name}.") and stale and not old.startswith(filename):
+            try:
+                os.remove(os.path.join(STATIC_DIR, old))
+            except OSError:
+                pass
+    return f"/static/{filename}"
+
+def read_source(directory: str, filename: str) -> str:
+    with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+# Build bosqichi: o'yin sahifasining CSS/JS ini kichraytirib xeshli fayllarga chiqarish
+# va HTML shablonlariga ularning manzillarini qo'yish
+def build_assets() -> Dict[str, str]:
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    game_css = write_asset("game", "css", minify_css(read_source(ASSETS_DIR, "game.css")))
+    game_js = write_asset("game", "js", minify_js(read_source(ASSETS_DIR, "game.js")))
+    game_html = read_source(PAGES_DIR, "game.html")
+    game_html = game_html.replace("%GAME_CSS%", game_css).replace("%GAME_JS%", game_js)
+    return {"home": read_source(PAGES_DIR, "home.html"), "game": game_html}
+
+# Xeshli assetlar: nomi kontentga bog'liq, shuning uchun bir yil keshlanadi.
+# Mijoz gzip qabul qilsa oldindan siqilgan .gz fayl beriladi.
+class AssetFiles(StaticFiles):
+    async def get_response(self, path: str, scope) -> Response:
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        full_path = os.path.join(self.directory, path)
+        response = None
+        if choose_encoding(accept_encoding, ("gzip",)) == "gzip" and os.path.isfile(full_path + ".gz"):
+            response = await super().get_response(path + ".gz", scope)
+            if response.status_code in (200, 304):
+                response.headers["Content-Encoding"] = "gzip"
+                media_type = mimetypes.guess_type(path)[0]
+                if media_type and response.status_code == 200:
+                    if media_type.startswith("text/"):
+                        media_type += "; charset=utf-8"
+                    response.headers["Content-Type"] = media_type
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+# Sahifani bir marta siqib tayyorlash: har kodlash uchun tayyor baytlar va kuchli ETag
+def build_page(html: str) -> dict:
+    body = html.encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:20]
+    variants = {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "deflate": zlib.compress(body, 9)
+    }
+    if brotli is not None:
+        variants["br"] = brotli.compress(body)
+    return {"etag": digest, "variants": variants}
+
+# Accept-Encoding bo'yicha eng yaxshi kodlashni tanlash
+def choose_encoding(accept_encoding: str, available) -> str:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+# If-None-Match dagi teglardan biri sahifa versiyasiga mos keladimi
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # If-None-Match kuchsiz taqqoslanadi - W/ prefiksi e'tiborga olinmaydi
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+# If-Match dagi teglardan biri joriy ETag ga mos keladimi - kuchli taqqoslash, W/ teglar mos kelmaydi
+def if_match_matches(if_match: str, etag: str) -> bool:
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+# Shartli GET: ETag mos kelsa tanasiz 304, aks holda ETag javobga qo'shiladi
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+# Tayyor sahifani so'rov sarlavhalariga qarab qaytarish
+def page_response(request: Request, page: dict, cache_control: str = "no-cache") -> Response:
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), page["variants"])
+    # Har kodlashning baytlari boshqa, shuning uchun kuchli ETag ham boshqa
+    etag = f'"{page["etag"]}"' if encoding == "identity" else f'"{page["etag"]}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=page["variants"][encoding], media_type="text/html; charset=utf-8", headers=headers)
+
+# Foydalanuvchi bo'yicha token chelaklari: username -> [tokenlar, oxirgi to'ldirish], eng eskisi boshida.
+# rate_buckets - so'rovlar, tap_buckets - WebSocket bosishlari (foydalanuvchining barcha ulanishlari uchun bitta).
+rate_buckets = OrderedDict()
+tap_buckets = OrderedDict()
+
+# Ochko yozuvchi endpointlar: /update_score (username tanada) va /user/{username}/increment|taps
+RATE_LIMITED_PATH = re.compile(r"^/user/([^/]+)/(?:increment|taps)$")
+
+# Foydalanuvchi chelagini hozirgi vaqtgacha to'ldirib qaytarish
+# Boshidagi (eng uzoq ishlatilmagan) yozuvlardan idle soniyadan beri tegilmaganlari va
+# limit berilgan bo'lsa undan ortiqlari o'chiriladi. Yozuvning oxirgi elementi - oxirgi ishlatilgan vaqt.
+def evict_idle(entries: OrderedDict, idle: float, now: float, limit: Optional[int] = None):
+    while entries:
+        oldest = next(iter(entries.values()))
+        if now - oldest[-1] < idle and (limit is None or len(entries) < limit):
+            break
+        entries.popitem(last=False)
 
-# HTML sahifani qaytarish
-@app.get("/", response_class=HTMLResponse)
-async def get_home():
-    return """
-    <!DOCTYPE html>
-    <html lang="uz">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Yangi Yil Konkursi API</title>
-        <style>
-            body {
-                font-family: Arial, sans-serif;
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-                background: linear-gradient(135deg, #0F1A30, #2D1B69);
-                color: white;
-            }
-            .container {
-                background: rgba(255, 255, 255, 0.1);
-                backdrop-filter: blur(10px);
-                border-radius: 20px;
-                padding: 30px;
-                margin-top: 20px;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-            }
-            h1 {
-                color: #FF3366;
-                text-align: center;
-            }
-            h2 {
-                color: #33CCFF;
-                border-bottom: 2px solid #33CCFF;
-                padding-bottom: 10px;
-            }
-            .endpoint {
-                background: rgba(255, 255, 255, 0.15);
-                padding: 15px;
-                border-radius: 10px;
-                margin: 10px 0;
-                border-left: 4px solid #FFCC00;
-            }
-            .method {
-                display: inline-block;
-                padding: 5px 10px;
-                border-radius: 5px;
-                font-weight: bold;
-                margin-right: 10px;
-            }
-            .get { background: #4CAF50; }
-            .post { background: #2196F3; }
-            .put { background: #FF9800; }
-            code {
-                background: rgba(0, 0, 0, 0.3);
-                padding: 2px 5px;
-                border-radius: 3px;
-            }
-            .stats {
-                display: grid;
-                grid-template-columns: repeat(2, 1fr);
-                gap: 20px;
-                margin-top: 30px;
-            }
-            .stat-box {
-                background: linear-gradient(135deg, #FF3366, #33CCFF);
-                padding: 20px;
-                border-radius: 15px;
-                text-align: center;
-            }
-        </style>
-    </head>
-    <body>
-        <h1>🎄 Yangi Yil Konkursi API 🎄</h1>
-        <div class="container">
-            <h2>API Endpointlar</h2>
-            
-            <div class="endpoint">
-                <span class="method post">POST</span>
-                <strong>/register</strong>
-                <p>Yangi foydalanuvchi ro'yxatdan o'tkazish</p>
-                <code>{ "username": "string", "password": "string" }</code>
-            </div>
-            
-            <div class="endpoint">
-                <span class="method post">POST</span>
-                <strong>/login</strong>
-                <p>Foydalanuvchi tizimga kirishi</p>
-                <code>{ "username": "string", "password": "string" }</code>
-            </div>
-            
-            <div class="endpoint">
-                <span class="method get">GET</span>
-                <strong>/users</strong>
-                <p>Barcha foydalanuvchilar ro'yxati</p>
-            </div>
-            
-            <div class="endpoint">
-                <span class="method get">GET</span>
-                <strong>/user/{username}</strong>
-                <p>Foydalanuvchi ma'lumotlari</p>
-            </div>
-            
-            <div class="endpoint">
-                <span class="method put">PUT</span>
-                <strong>/update_score</strong>
-                <p>Foydalanuvchi ochkosini yangilash</p>
-                <code>{ "username": "string", "score": integer }</code>
-            </div>
-            
-            <div class="endpoint">
-                <span class="method get">GET</span>
-                <strong>/leaderboard</strong>
-                <p>Reyting jadvali (TOP 10)</p>
-            </div>
-            
-            <div class="endpoint">
-                <span class="method get">GET</span>
-                <strong>/game_page</strong>
-                <p>O'yin sahifasini olish (HTML)</p>
-            </div>
-            
-            <div class="stats">
-                <div class="stat-box">
-                    <h3>👥 Foydalanuvchilar</h3>
-                    <p id="userCount">0</p>
-                </div>
-                <div class="stat-box">
-                    <h3>🏆 Eng yuqori ochko</h3>
-                    <p id="topScore">0</p>
-                </div>
-            </div>
-        </div>
+def refill_bucket(buckets: OrderedDict, username: str, rate: float, burst: float) -> list:
+    now = time.monotonic()
+    # Chelak to'lgunicha bo'sh turganlar o'chiriladi - to'la chelak yo'q chelak bilan bir xil
+    evict_idle(buckets, burst / rate, now, RATE_LIMIT_MAX_BUCKETS)
+    
+    bucket = buckets.pop(username, None)
+    if bucket is None:
+        bucket = [burst, now]
+    else:
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+    buckets[username] = bucket
+    return bucket
+
+# Bitta so'rovga token olish; berilmasa necha soniyadan keyin urinish mumkinligi qaytadi
+def take_token(username: str) -> Optional[float]:
+    bucket = refill_bucket(rate_buckets, username, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+    if bucket[0] >= 1:
+        bucket[0] -= 1
+        return None
+    return (1 - bucket[0]) / RATE_LIMIT_PER_SECOND
+
+# WebSocket bosishlaridan qabul qilinadiganlari soni: soniyasiga MAX_TAPS_PER_SECOND, 1 soniyalik zaxira bilan
+def take_taps(username: str, count: int) -> int:
+    bucket = refill_bucket(tap_buckets, username, MAX_TAPS_PER_SECOND, MAX_TAPS_PER_SECOND)
+    accepted = min(count, int(bucket[0]))
+    bucket[0] -= accepted
+    return accepted
+
+# Tanadagi username - JSON buzuq bo'lsa None, unda so'rov validatsiyaga o'tadi
+def body_username(body: bytes) -> Optional[str]:
+    try:
+        username = json.loads(body).get("username")
+    except (ValueError, AttributeError):
+        return None
+    return username if isinstance(username, str) else None
+
+# Tezlik chegarasi: FastAPI dan oldin ishlaydigan ASGI qatlami, shuning uchun
+# rad etilgan so'rov tana validatsiyasi va ombordan o'tmaydi
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
         
-        <script>
-            async function loadStats() {
-                try {
-                    const usersRes = await fetch('/users');
-                    const users = await usersRes.json();
-                    document.getElementById('userCount').textContent = users.length;
-                    
-                    if (users.length > 0) {
-                        const topUser = users.reduce((max, user) => 
-                            user.score > max.score ? user : max
-                        );
-                        document.getElementById('topScore').textContent = 
-                            `${topUser.score} (${topUser.username})`;
-                    }
-                } catch (error) {
-                    console.error('Statistika yuklashda xatolik:', error);
-                }
-            }
+        username = None
+        method, path = scope["method"], scope["path"]
+        if method == "POST":
+            match = RATE_LIMITED_PATH.match(path)
+            if match:
+                username = match.group(1)
+        elif method == "PUT" and path == "/update_score":
+            # Tana o'qib olinadi va keyin ilovaga aynan shunday qayta beriladi
+            body, messages = b"", []
+            while True:
+                message = await receive()
+                messages.append(message)
+                if message["type"] != "http.request":
+                    break
+                body += message.get("body", b"")
+                if not message.get("more_body") or len(body) > RATE_LIMIT_MAX_BODY:
+                    break
+            if len(body) > RATE_LIMIT_MAX_BODY:
+                # Ortiqcha maydonlar bilan to'ldirilgan tana username siz qolib cheklovdan o'tib ketardi
+                response = JSONResponse(status_code=413, content={"detail": "So'rov tanasi juda katta"})
+                return await response(scope, receive, send)
+            username = body_username(body)
             
-            loadStats();
-        </script>
-    </body>
-    </html>
-    """
-
-# O'yin sahifasini qaytarish (asl HTML kod)
-@app.get("/game_page", response_class=HTMLResponse)
-async def get_game_page():
-    html_content = """
-    <!DOCTYPE html>
-<html lang="uz">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>🎅 Yangi Yil Konkursi 2025</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <style>
-        :root {
-            --primary: #FF3366;
-            --secondary: #33CCFF;
-            --accent: #FFCC00;
-            --dark: #0F1A30;
-            --light: #F8F9FF;
-            --success: #00D4A4;
-            --warning: #FF9966;
-            --glass: rgba(255, 255, 255, 0.15);
-            --glass-dark: rgba(15, 26, 48, 0.85);
-            --shadow: 0 10px 30px rgba(0, 0, 0, 0.3);
-            --gradient: linear-gradient(135deg, var(--primary), var(--secondary));
-            --gradient-alt: linear-gradient(135deg, var(--accent), var(--warning));
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-            -webkit-tap-highlight-color: transparent;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: var(--dark);
-            color: var(--light);
-            min-height: 100vh;
-            overflow-x: hidden;
-            background-image: 
-                radial-gradient(circle at 20% 80%, rgba(255, 51, 102, 0.2) 0%, transparent 50%),
-                radial-gradient(circle at 80% 20%, rgba(51, 204, 255, 0.2) 0%, transparent 50%),
-                url('https://images.unsplash.com/photo-1454789476662-53eb23ba5907?ixlib=rb-4.0.3&auto=format&fit=crop&w=2000&q=80');
-            background-size: cover;
-            background-attachment: fixed;
-            background-position: center;
-        }
-
-        /* Snow Animation */
-        .snow {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            pointer-events: none;
-            z-index: 1;
-        }
-
-        .snowflake {
-            position: absolute;
-            background: white;
-            border-radius: 50%;
-            opacity: 0.8;
-            animation: fall linear infinite;
-        }
-
-        @keyframes fall {
-            to {
-                transform: translateY(100vh);
-            }
-        }
-
-        /* Container */
-        .container {
-            max-width: 100%;
-            width: 100%;
-            margin: 0 auto;
-            padding: 15px;
-            position: relative;
-            z-index: 2;
-        }
-
-        /* Auth Pages */
-        .auth-container {
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-            align-items: center;
-            min-height: 100vh;
-            padding: 20px;
-            animation: fadeIn 0.8s ease-out;
-        }
-
-        .auth-card {
-            background: var(--glass-dark);
-            backdrop-filter: blur(20px);
-            border-radius: 25px;
-            padding: 30px 25px;
-            width: 100%;
-            max-width: 450px;
-            border: 1px solid rgba(255, 255, 255, 0.15);
-            box-shadow: var(--shadow);
-            animation: slideUp 0.6s ease-out;
-        }
-
-        .auth-header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .auth-logo {
-            font-size: 60px;
-            margin-bottom: 15px;
-            display: block;
-            animation: bounce 2s infinite;
-        }
-
-        .auth-title {
-            font-size: 28px;
-            font-weight: 800;
-            background: var(--gradient);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin-bottom: 10px;
-        }
-
-        .auth-subtitle {
-            color: rgba(255, 255, 255, 0.7);
-            font-size: 16px;
-        }
-
-        /* Form Elements */
-        .input-group {
-            position: relative;
-            margin-bottom: 20px;
-        }
-
-        .input-icon {
-            position: absolute;
-            left: 20px;
-            top: 50%;
-            transform: translateY(-50%);
-            color: var(--secondary);
-            font-size: 18px;
-        }
-
-        .form-input {
-            width: 100%;
-            padding: 18px 20px 18px 55px;
-            border: 2px solid rgba(255, 255, 255, 0.15);
-            border-radius: 15px;
-            background: rgba(255, 255, 255, 0.1);
-            color: white;
-            font-size: 16px;
-            transition: all 0.3s ease;
-        }
-
-        .form-input:focus {
-            outline: none;
-            border-color: var(--secondary);
-            background: rgba(255, 255, 255, 0.15);
-            box-shadow: 0 0 0 3px rgba(51, 204, 255, 0.3);
-        }
-
-        .form-input::placeholder {
-            color: rgba(255, 255, 255, 0.6);
-        }
-
-        /* Buttons */
-        .btn {
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 10px;
-            width: 100%;
-            padding: 18px;
-            border: none;
-            border-radius: 15px;
-            font-size: 18px;
-            font-weight: 700;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-
-        .btn:active {
-            transform: scale(0.98);
-        }
-
-        .btn-primary {
-            background: var(--gradient);
-            color: white;
-            box-shadow: 0 5px 15px rgba(255, 51, 102, 0.4);
-        }
-
-        .btn-primary:hover {
-            transform: translateY(-3px);
-            box-shadow: 0 8px 20px rgba(255, 51, 102, 0.5);
-        }
-
-        .btn-secondary {
-            background: rgba(255, 255, 255, 0.15);
-            color: white;
-            border: 2px solid rgba(255, 255, 255, 0.25);
-        }
-
-        .btn-secondary:hover {
-            background: rgba(255, 255, 255, 0.2);
-            border-color: rgba(255, 255, 255, 0.35);
-        }
-
-        .btn-icon {
-            font-size: 20px;
-        }
-
-        /* Link */
-        .auth-link {
-            text-align: center;
-            margin-top: 25px;
-            color: rgba(255, 255, 255, 0.7);
-        }
-
-        .auth-link a {
-            color: var(--secondary);
-            text-decoration: none;
-            font-weight: 600;
-        }
-
-        .auth-link a:hover {
-            text-decoration: underline;
-        }
-
-        /* App Pages */
-        #app-page {
-            display: none;
-            animation: fadeIn 0.8s ease-out;
-        }
-
-        /* Navbar */
-        .navbar {
-            display: flex;
-            justify-content: space-around;
-            background: var(--glass-dark);
-            backdrop-filter: blur(20px);
-            border-radius: 20px;
-            padding: 10px;
-            margin-bottom: 20px;
-            border: 1px solid rgba(255, 255, 255, 0.15);
-            position: sticky;
-            top: 10px;
-            z-index: 100;
-        }
-
-        .nav-btn {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            gap: 5px;
-            background: transparent;
-            border: none;
-            color: rgba(255, 255, 255, 0.7);
-            padding: 12px 10px;
-            border-radius: 12px;
-            cursor: pointer;
-            font-size: 12px;
-            transition: all 0.3s ease;
-            min-width: 70px;
-        }
-
-        .nav-btn i {
-            font-size: 20px;
-        }
-
-        .nav-btn.active {
-            background: var(--gradient);
-            color: white;
-            box-shadow: 0 5px 15px rgba(255, 51, 102, 0.4);
-            transform: scale(1.05);
-        }
-
-        /* Pages */
-        .page {
-            display: none;
-            animation: slideIn 0.5s ease-out;
-        }
-
-        .page.active {
-            display: block;
-        }
-
-        /* Cards */
-        .card {
-            background: var(--glass);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 25px;
-            margin-bottom: 20px;
-            border: 1px solid rgba(255, 255, 255, 0.15);
-            box-shadow: var(--shadow);
-            animation: fadeInUp 0.6s ease-out;
-        }
-
-        .card-title {
-            font-size: 22px;
-            font-weight: 700;
-            margin-bottom: 15px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-
-        .card-title i {
-            color: var(--accent);
-        }
-
-        /* Welcome Section */
-        .welcome-section {
-            text-align: center;
-            margin-bottom: 30px;
-            padding: 20px 0;
-        }
-
-        .welcome-title {
-            font-size: 32px;
-            font-weight: 800;
-            background: var(--gradient);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin-bottom: 10px;
-            animation: pulse 2s infinite;
-        }
-
-        .welcome-user {
-            font-size: 24px;
-            color: var(--light);
-            font-weight: 600;
-        }
-
-        /* Countdown - YANGILANGAN */
-        .countdown-container {
-            text-align: center;
-            margin: 40px 0;
-        }
-
-        .countdown-title {
-            font-size: 24px;
-            margin-bottom: 25px;
-            color: var(--light);
-            text-shadow: 0 2px 10px rgba(0, 0, 0, 0.3);
-        }
-
-        .countdown-grid {
-            display: grid;
-            grid-template-columns: repeat(4, 1fr);
-            gap: 15px;
-        }
-
-        .countdown-box {
-            background: linear-gradient(145deg, rgba(255, 51, 102, 0.9), rgba(51, 204, 255, 0.9));
-            border-radius: 15px;
-            padding: 20px 10px;
-            border: 2px solid rgba(255, 255, 255, 0.3);
-            transition: all 0.4s cubic-bezier(0.175, 0.885, 0.32, 1.275);
-            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.2);
-            position: relative;
-            overflow: hidden;
-        }
-
-        .countdown-box:hover {
-            transform: translateY(-10px) scale(1.05);
-            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.3);
-            border-color: rgba(255, 255, 255, 0.5);
-        }
-
-        .countdown-box:active {
-            transform: translateY(-5px) scale(1.02);
-        }
-
-        .countdown-value {
-            font-size: 36px;
-            font-weight: 900;
-            color: white;
-            text-shadow: 0 2px 10px rgba(0, 0, 0, 0.3);
-            position: relative;
-            z-index: 2;
-        }
-
-        .countdown-label {
-            font-size: 14px;
-            color: rgba(255, 255, 255, 0.9);
-            margin-top: 5px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            font-weight: 600;
-            position: relative;
-            z-index: 2;
-        }
-
-        /* Countdown uchun animatsiya */
-        @keyframes countdownPulse {
-            0% { transform: scale(1); }
-            50% { transform: scale(1.05); }
-            100% { transform: scale(1); }
-        }
-
-        .countdown-animation {
-            animation: countdownPulse 0.5s ease;
-        }
-
-        /* Prizes */
-        .prizes-container {
-            display: grid;
-            grid-template-columns: repeat(3, 1fr);
-            gap: 15px;
-            margin-top: 20px;
-        }
-
-        .prize-item {
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 15px;
-            padding: 20px 15px;
-            text-align: center;
-            transition: all 0.3s ease;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-
-        .prize-item:hover {
-            transform: translateY(-5px);
-            background: rgba(255, 255, 255, 0.15);
-            border-color: rgba(255, 255, 255, 0.2);
-        }
-
-        .prize-medal {
-            font-size: 40px;
-            margin-bottom: 10px;
-            filter: drop-shadow(0 0 10px rgba(255, 204, 0, 0.5));
-        }
-
-        .prize-stars {
-            font-size: 20px;
-            color: var(--accent);
-            font-weight: 700;
-        }
-
-        /* Game Page */
-        .game-header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .score-container {
-            display: inline-block;
-            background: var(--gradient);
-            padding: 15px 30px;
-            border-radius: 20px;
-            box-shadow: 0 10px 20px rgba(255, 51, 102, 0.4);
-        }
-
-        .score-label {
-            font-size: 16px;
-            opacity: 0.9;
-        }
-
-        .score-value {
-            font-size: 48px;
-            font-weight: 800;
-        }
-
-        .tree-container {
-            text-align: center;
-            margin: 40px 0;
-            perspective: 1000px;
-        }
-
-        .christmas-tree {
-            font-size: 150px;
-            cursor: pointer;
-            display: inline-block;
-            animation: float 3s ease-in-out infinite;
-            filter: drop-shadow(0 0 20px rgba(0, 255, 157, 0.5));
-            transition: transform 0.1s ease;
-            user-select: none;
-        }
-
-        .christmas-tree:active {
-            transform: scale(0.9) rotate(5deg);
-            filter: drop-shadow(0 0 30px rgba(0, 255, 157, 0.8));
-        }
-
-        .tap-instruction {
-            color: var(--secondary);
-            font-size: 18px;
-            margin-top: 15px;
-            animation: blink 2s infinite;
-            font-weight: 600;
-        }
-
-        /* Xabar uchun konteyner - O'CHIRILDI */
-        /* .message-container {
-            min-height: 60px;
-            margin: 20px 0;
-            text-align: center;
-        } */
-
-        /* YANGI: Bosilganda chiqadigan xabar */
-        .tap-feedback {
-            position: fixed;
-            pointer-events: none;
-            z-index: 1000;
-            font-size: 24px;
-            font-weight: 800;
-            color: var(--accent);
-            text-shadow: 0 2px 10px rgba(0, 0, 0, 0.5);
-            animation: floatUp 1s ease-out forwards;
-        }
-
-        @keyframes floatUp {
-            0% {
-                opacity: 1;
-                transform: translateY(0) scale(1);
-            }
-            100% {
-                opacity: 0;
-                transform: translateY(-100px) scale(1.5);
-            }
-        }
-
-        /* Leaderboard */
-        .leaderboard-header {
-            text-align: center;
-            margin-bottom: 25px;
-        }
-
-        .leaderboard-title {
-            font-size: 28px;
-            font-weight: 800;
-            background: var(--gradient-alt);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-        }
-
-        .leaderboard-list {
-            background: var(--glass-dark);
-            border-radius: 20px;
-            padding: 15px;
-            border: 1px solid rgba(255, 255, 255, 0.15);
-        }
-
-        .leaderboard-item {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 18px 15px;
-            border-bottom: 1px solid rgba(255, 255, 255, 0.15);
-            transition: all 0.3s ease;
-        }
-
-        .leaderboard-item:last-child {
-            border-bottom: none;
-        }
-
-        .leaderboard-item:hover {
-            background: rgba(255, 255, 255, 0.08);
-            transform: translateX(5px);
-        }
-
-        .leaderboard-rank {
-            font-size: 20px;
-            font-weight: 800;
-            width: 40px;
-            text-align: center;
-        }
-
-        .leaderboard-user {
-            flex: 1;
-            padding: 0 15px;
-            font-size: 18px;
-            font-weight: 600;
-        }
-
-        .leaderboard-score {
-            font-size: 22px;
-            font-weight: 800;
-            color: var(--accent);
-        }
-
-        /* Current User Highlight */
-        .current-user {
-            background: linear-gradient(90deg, rgba(255, 51, 102, 0.25), rgba(51, 204, 255, 0.25));
-            border-radius: 15px;
-            border-left: 4px solid var(--accent);
-        }
-
-        /* Animations */
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-
-        @keyframes slideUp {
-            from { transform: translateY(30px); opacity: 0; }
-            to { transform: translateY(0); opacity: 1; }
-        }
-
-        @keyframes slideIn {
-            from { transform: translateX(20px); opacity: 0; }
-            to { transform: translateX(0); opacity: 1; }
-        }
-
-        @keyframes fadeInUp {
-            from { transform: translateY(20px); opacity: 0; }
-            to { transform: translateY(0); opacity: 1; }
-        }
-
-        @keyframes bounce {
-            0%, 100% { transform: translateY(0); }
-            50% { transform: translateY(-15px); }
-        }
-
-        @keyframes float {
-            0%, 100% { transform: translateY(0); }
-            50% { transform: translateY(-20px); }
-        }
-
-        @keyframes blink {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.7; }
-        }
-
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.8; }
-        }
-
-        @keyframes glow {
-            0%, 100% { filter: drop-shadow(0 0 10px rgba(255, 204, 0, 0.7)); }
-            50% { filter: drop-shadow(0 0 20px rgba(255, 204, 0, 1)); }
-        }
-
-        /* Responsive */
-        @media (max-width: 480px) {
-            .container {
-                padding: 10px;
-            }
-            
-            .auth-card {
-                padding: 25px 20px;
-                margin: 10px;
-            }
-            
-            .auth-logo {
-                font-size: 50px;
-            }
-            
-            .auth-title {
-                font-size: 24px;
-            }
-            
-            .countdown-value {
-                font-size: 32px;
-            }
-            
-            .countdown-box {
-                padding: 15px 8px;
-            }
-            
-            .christmas-tree {
-                font-size: 130px;
-            }
-            
-            .score-value {
-                font-size: 40px;
-            }
-            
-            .navbar {
-                padding: 8px;
-            }
-            
-            .nav-btn {
-                min-width: 60px;
-                padding: 10px 5px;
-                font-size: 11px;
-            }
-            
-            .nav-btn i {
-                font-size: 18px;
-            }
-            
-            .prizes-container {
-                grid-template-columns: 1fr;
-                gap: 12px;
-            }
-            
-            .countdown-grid {
-                gap: 10px;
-            }
-            
-            .welcome-title {
-                font-size: 28px;
-            }
-        }
-
-        @media (min-width: 768px) {
-            .container {
-                max-width: 750px;
-            }
-            
-            .countdown-value {
-                font-size: 42px;
-            }
-            
-            .christmas-tree {
-                font-size: 180px;
-            }
-        }
-
-        /* Loading Animation */
-        .loading {
-            display: inline-block;
-            width: 20px;
-            height: 20px;
-            border: 3px solid rgba(255, 255, 255, 0.3);
-            border-radius: 50%;
-            border-top-color: var(--secondary);
-            animation: spin 1s ease-in-out infinite;
-        }
-
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-
-        /* Effects */
-        .sparkle {
-            position: absolute;
-            width: 10px;
-            height: 10px;
-            background: white;
-            border-radius: 50%;
-            pointer-events: none;
-            opacity: 0;
-            animation: sparkle 0.5s ease-out;
-        }
-
-        @keyframes sparkle {
-            0% { transform: scale(0); opacity: 1; }
-            100% { transform: scale(1); opacity: 0; }
-        }
-
-        /* Confetti */
-        .confetti {
-            position: fixed;
-            width: 10px;
-            height: 10px;
-            pointer-events: none;
-            opacity: 0;
-            z-index: 1000;
-        }
-    </style>
-</head>
-<body>
-    <!-- Qor effekti -->
-    <div class="snow" id="snow"></div>
-
-    <!-- Ro'yxatdan o'tish sahifasi -->
-    <div id="register-page" class="auth-container" style="display:none;">
-        <div class="auth-card">
-            <div class="auth-header">
-                <div class="auth-logo">🎅</div>
-                <h1 class="auth-title">Yangi Yil Konkursi</h1>
-                <p class="auth-subtitle">Qatnashing va yutib oling!</p>
-            </div>
-            
-            <div class="input-group">
-                <i class="input-icon fas fa-user"></i>
-                <input type="text" id="reg-username" class="form-input" placeholder="Foydalanuvchi nomi" required>
-            </div>
-            
-            <div class="input-group">
-                <i class="input-icon fas fa-lock"></i>
-                <input type="password" id="reg-password" class="form-input" placeholder="Parol" required>
-            </div>
-            
-            <button class="btn btn-primary" onclick="register()">
-                <i class="btn-icon fas fa-user-plus"></i>
-                Ro'yxatdan o'tish
-            </button>
-            
-            <div id="register-message" class="auth-link" style="margin-top:15px;"></div>
-            
-            <div class="auth-link">
-                Allaqachon hisobingiz bormi? 
-                <a href="#" onclick="showLogin()">Kirish</a>
-            </div>
-        </div>
-    </div>
-
-    <!-- Kirish sahifasi -->
-    <div id="login-page" class="auth-container">
-        <div class="auth-card">
-            <div class="auth-header">
-                <div class="auth-logo">🔑</div>
-                <h1 class="auth-title">Hisobingizga kiring</h1>
-                <p class="auth-subtitle">O'yinni davom ettiring</p>
-            </div>
-            
-            <div class="input-group">
-                <i class="input-icon fas fa-user"></i>
-                <input type="text" id="login-username" class="form-input" placeholder="Foydalanuvchi nomi" required>
-            </div>
-            
-            <div class="input-group">
-                <i class="input-icon fas fa-lock"></i>
-                <input type="password" id="login-password" class="form-input" placeholder="Parol" required>
-            </div>
-            
-            <button class="btn btn-primary" onclick="login()">
-                <i class="btn-icon fas fa-sign-in-alt"></i>
-                Kirish
-            </button>
-            
-            <div id="login-message" class="auth-link" style="margin-top:15px;"></div>
-            
-            <div class="auth-link">
-                Hisobingiz yo'qmi? 
-                <a href="#" onclick="showRegister()">Ro'yxatdan o'tish</a>
-            </div>
-        </div>
-    </div>
-
-    <!-- Asosiy app sahifasi -->
-    <div id="app-page" class="container">
-        <!-- Navbar -->
-        <nav class="navbar">
-            <button class="nav-btn active" onclick="showPage('main')">
-                <i class="fas fa-home"></i>
-                Asosiy
-            </button>
-            <button class="nav-btn" onclick="showPage('game')">
-                <i class="fas fa-gamepad"></i>
-                O'yin
-            </button>
-            <button class="nav-btn" onclick="showPage('leaderboard')">
-                <i class="fas fa-trophy"></i>
-                Reyting
-            </button>
-            <button class="nav-btn" onclick="logout()">
-                <i class="fas fa-sign-out-alt"></i>
-                Chiqish
-            </button>
-        </nav>
-
-        <!-- Asosiy sahifa -->
-        <div id="main" class="page active">
-            <div class="welcome-section">
-                <h1 class="welcome-title">🎄 Yangi Yil Konkursi 🎄</h1>
-                <div class="welcome-user" id="welcome"></div>
-            </div>
-
-            <!-- Countdown -->
-            <div class="countdown-container">
-                <h2 class="countdown-title">⏳ Yangi Yilgacha qoldi:</h2>
-                <div class="countdown-grid">
-                    <div class="countdown-box" onclick="animateCountdown('days')">
-                        <div id="days" class="countdown-value">00</div>
-                        <div class="countdown-label">Kun</div>
-                    </div>
-                    <div class="countdown-box" onclick="animateCountdown('hours')">
-                        <div id="hours" class="countdown-value">00</div>
-                        <div class="countdown-label">Soat</div>
-                    </div>
-                    <div class="countdown-box" onclick="animateCountdown('minutes')">
-                        <div id="minutes" class="countdown-value">00</div>
-                        <div class="countdown-label">Minut</div>
-                    </div>
-                    <div class="countdown-box" onclick="animateCountdown('seconds')">
-                        <div id="seconds" class="countdown-value">00</div>
-                        <div class="countdown-label">Sekund</div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Sovg'alar -->
-            <div class="card">
-                <h2 class="card-title"><i class="fas fa-gift"></i> Sovg'alar</h2>
-                <div class="prizes-container">
-                    <div class="prize-item">
-                        <div class="prize-medal">🥇</div>
-                        <div class="prize-stars">50 yulduz</div>
-                        <div>1-o'rin</div>
-                    </div>
-                    <div class="prize-item">
-                        <div class="prize-medal">🥈</div>
-                        <div class="prize-stars">25 yulduz</div>
-                        <div>2-o'rin</div>
-                    </div>
-                    <div class="prize-item">
-                        <div class="prize-medal">🥉</div>
-                        <div class="prize-stars">15 yulduz</div>
-                        <div>3-o'rin</div>
-                    </div>
-                </div>
-            </div>
-
-            <button class="btn btn-primary" onclick="showPage('game')">
-                <i class="fas fa-play-circle"></i>
-                O'ynashni boshlash
-            </button>
-        </div>
-
-        <!-- O'yin sahifasi -->
-        <div id="game" class="page">
-            <div class="game-header">
-                <div class="score-container">
-                    <div class="score-label">Joriy ochko:</div>
-                    <div class="score-value" id="score">0</div>
-                </div>
-            </div>
-
-            <div class="tree-container">
-                <div class="christmas-tree" onclick="tapTree(event)">🎄</div>
-                <div class="tap-instruction">Archani bosing! ⬆️</div>
-            </div>
-
-            <!-- Xabar konteyneri O'CHIRILDI -->
-
-            <button class="btn btn-secondary" onclick="showPage('leaderboard')">
-                <i class="fas fa-trophy"></i>
-                Reytingni ko'rish
-            </button>
-        </div>
-
-        <!-- Leaderboard sahifasi -->
-        <div id="leaderboard" class="page">
-            <div class="leaderboard-header">
-                <h1 class="leaderboard-title">🏆 TOP 10 O'yinchilar</h1>
-            </div>
-
-            <div class="card">
-                <div id="leaderboard-list" class="leaderboard-list"></div>
-            </div>
-
-            <button class="btn btn-primary" onclick="showPage('game')">
-                <i class="fas fa-arrow-left"></i>
-                O'yin sahifasiga qaytish
-            </button>
-        </div>
-    </div>
-
-    <script>
-        // API URL - o'zgartirilgan
-        const API_BASE_URL = window.location.origin;
+            # replay ichida qayta bog'langan receive emas, asl manba chaqirilishi kerak
+            upstream = receive
+            async def replay():
+                return messages.pop(0) if messages else await upstream()
+            receive = replay
         
-        // Global o'zgaruvchilar
-        let currentUser = null;
-        let countdownInterval = null;
-        let snowInterval = null;
-        let lastTapTime = 0;
-        const tapDelay = 100; // 100ms delay between taps
-
-        // Qor effekti yaratish
-        function createSnow() {
-            const snow = document.getElementById('snow');
-            snow.innerHTML = '';
-            
-            for (let i = 0; i < 50; i++) {
-                const snowflake = document.createElement('div');
-                snowflake.classList.add('snowflake');
-                
-                const size = Math.random() * 5 + 3;
-                const left = Math.random() * 100;
-                const opacity = Math.random() * 0.6 + 0.4;
-                const duration = Math.random() * 10 + 10;
-                
-                snowflake.style.width = `${size}px`;
-                snowflake.style.height = `${size}px`;
-                snowflake.style.left = `${left}%`;
-                snowflake.style.opacity = opacity;
-                snowflake.style.animationDuration = `${duration}s`;
-                snowflake.style.animationDelay = `${Math.random() * 5}s`;
-                
-                snow.appendChild(snowflake);
-            }
-        }
-
-        // Chayqalish effekti
-        function createSparkle(x, y) {
-            const sparkle = document.createElement('div');
-            sparkle.classList.add('sparkle');
-            sparkle.style.left = `${x}px`;
-            sparkle.style.top = `${y}px`;
-            
-            document.body.appendChild(sparkle);
-            
-            setTimeout(() => {
-                sparkle.remove();
-            }, 500);
-        }
-
-        // YANGI: Bosilganda chiqadigan xabar
-        function createTapFeedback(x, y, text) {
-            const feedback = document.createElement('div');
-            feedback.classList.add('tap-feedback');
-            feedback.textContent = text;
-            feedback.style.left = `${x}px`;
-            feedback.style.top = `${y}px`;
-            
-            document.body.appendChild(feedback);
-            
-            setTimeout(() => {
-                feedback.remove();
-            }, 1000);
-        }
-
-        // Confetti effekti
-        function createConfetti() {
-            const colors = ['#FF3366', '#33CCFF', '#FFCC00', '#00D4A4', '#FF9966'];
-            
-            for (let i = 0; i < 30; i++) {
-                const confetti = document.createElement('div');
-                confetti.classList.add('confetti');
-                confetti.style.backgroundColor = colors[Math.floor(Math.random() * colors.length)];
-                confetti.style.left = `${Math.random() * 100}vw`;
-                confetti.style.top = `-10px`;
-                
-                const size = Math.random() * 10 + 5;
-                confetti.style.width = `${size}px`;
-                confetti.style.height = `${size}px`;
-                confetti.style.borderRadius = Math.random() > 0.5 ? '50%' : '0';
-                
-                document.body.appendChild(confetti);
-                
-                // Animatsiya
-                const animation = confetti.animate([
-                    { transform: `translateY(0) rotate(0deg)`, opacity: 1 },
-                    { transform: `translateY(${window.innerHeight}px) rotate(${Math.random() * 360}deg)`, opacity: 0 }
-                ], {
-                    duration: Math.random() * 2000 + 1000,
-                    easing: 'cubic-bezier(0.215, 0.610, 0.355, 1)'
-                });
-                
-                animation.onfinish = () => confetti.remove();
-            }
-        }
-
-        // YANGI: Countdown animatsiyasi
-        function animateCountdown(elementId) {
-            const element = document.getElementById(elementId);
-            const box = element.closest('.countdown-box');
-            
-            // Animatsiya qo'shish
-            box.classList.add('countdown-animation');
-            
-            // Animatsiyani tozalash
-            setTimeout(() => {
-                box.classList.remove('countdown-animation');
-            }, 500);
-            
-            // Ovoz effekti (agar ruxsat bo'lsa)
-            try {
-                const audioContext = new (window.AudioContext || window.webkitAudioContext)();
-                const oscillator = audioContext.createOscillator();
-                const gainNode = audioContext.createGain();
-                
-                oscillator.connect(gainNode);
-                gainNode.connect(audioContext.destination);
-                
-                oscillator.frequency.value = 800;
-                oscillator.type = 'sine';
-                
-                gainNode.gain.setValueAtTime(0.3, audioContext.currentTime);
-                gainNode.gain.exponentialRampToValueAtTime(0.01, audioContext.currentTime + 0.1);
-                
-                oscillator.start(audioContext.currentTime);
-                oscillator.stop(audioContext.currentTime + 0.1);
-            } catch (e) {
-                console.log('Audio context not supported');
-            }
-        }
-
-        // Sahifalarni ko'rsatish
-        function showRegister() {
-            document.getElementById('login-page').style.display = 'none';
-            document.getElementById('register-page').style.display = 'flex';
-            document.getElementById('app-page').style.display = 'none';
-        }
-
-        function showLogin() {
-            document.getElementById('register-page').style.display = 'none';
-            document.getElementById('login-page').style.display = 'flex';
-            document.getElementById('app-page').style.display = 'none';
-        }
-
-        // Ro'yxatdan o'tish (API orqali)
-        async function register() {
-            const username = document.getElementById('reg-username').value.trim();
-            const password = document.getElementById('reg-password').value.trim();
-            const message = document.getElementById('register-message');
-            
-            if (!username || !password) {
-                showMessage(message, 'Iltimos, barcha maydonlarni to\'ldiring', 'error');
-                return;
-            }
-            
-            if (username.length < 3) {
-                showMessage(message, 'Username kamida 3 belgidan iborat bo\'lishi kerak', 'error');
-                return;
-            }
-            
-            if (password.length < 4) {
-                showMessage(message, 'Parol kamida 4 belgidan iborat bo\'lishi kerak', 'error');
-                return;
-            }
-            
-            try {
-                const response = await fetch(`${API_BASE_URL}/register`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ username, password })
-                });
-                
-                const data = await response.json();
-                
-                if (response.ok) {
-                    showMessage(message, '✅ Ro\'yxatdan o\'tdingiz! Endi kirishingiz mumkin', 'success');
-                    createConfetti();
-                    
-                    setTimeout(() => {
-                        showLogin();
-                        document.getElementById('login-username').value = username;
-                        document.getElementById('reg-username').value = '';
-                        document.getElementById('reg-password').value = '';
-                        message.innerHTML = '';
-                    }, 2000);
-                } else {
-                    showMessage(message, data.detail || 'Xatolik yuz berdi', 'error');
-                }
-            } catch (error) {
-                showMessage(message, 'Server bilan bog\'lanishda xatolik', 'error');
-            }
-        }
-
-        // Kirish (API orqali)
-        async function login() {
-            const username = document.getElementById('login-username').value.trim();
-            const password = document.getElementById('login-password').value.trim();
-            const message = document.getElementById('login-message');
-            
-            if (!username || !password) {
-                showMessage(message, 'Iltimos, barcha maydonlarni to\'ldiring', 'error');
-                return;
-            }
-            
-            try {
-                const response = await fetch(`${API_BASE_URL}/login`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ username, password })
-                });
-                
-                const data = await response.json();
-                
-                if (response.ok) {
-                    currentUser = username;
-                    
-                    document.getElementById('login-page').style.display = 'none';
-                    document.getElementById('register-page').style.display = 'none';
-                    document.getElementById('app-page').style.display = 'block';
-                    document.getElementById('welcome').innerHTML = `🎉 Xush kelibsiz, <span style="color:#33CCFF">${username}</span>!`;
-                    
-                    // Effektlarni boshlash
-                    startCountdown();
-                    updateUserData();
-                    loadLeaderboard();
-                    createConfetti();
-                    
-                    message.innerHTML = '';
-                    document.getElementById('login-username').value = '';
-                    document.getElementById('login-password').value = '';
-                } else {
-                    showMessage(message, data.detail || 'Noto\'g\'ri username yoki parol', 'error');
-                }
-            } catch (error) {
-                showMessage(message, 'Server bilan bog\'lanishda xatolik', 'error');
-            }
-        }
-
-        // Xabar ko'rsatish
-        function showMessage(element, text, type) {
-            element.innerHTML = `<span style="color:${type === 'error' ? '#FF3366' : '#00D4A4'}; font-weight:600;">${text}</span>`;
-        }
-
-        // App sahifalarni ko'rsatish
-        function showPage(pageId) {
-            // Sahifalarni yashirish
-            document.querySelectorAll('.page').forEach(page => {
-                page.style.display = 'none';
-                page.classList.remove('active');
-            });
-            
-            // Navbarni yangilash
-            document.querySelectorAll('.nav-btn').forEach(btn => {
-                btn.classList.remove('active');
-            });
-            
-            // Tanlangan sahifani ko'rsatish
-            document.getElementById(pageId).style.display = 'block';
-            document.getElementById(pageId).classList.add('active');
-            
-            // Tanlangan tugmani faollashtirish
-            const activeBtn = Array.from(document.querySelectorAll('.nav-btn')).find(btn => 
-                btn.textContent.includes(pageId === 'main' ? 'Asosiy' : 
-                                       pageId === 'game' ? 'O\'yin' : 
-                                       pageId === 'leaderboard' ? 'Reyting' : '')
-            );
-            if (activeBtn) activeBtn.classList.add('active');
-            
-            // Sahifa o'zgarishida qo'shimcha amallar
-            if (pageId === 'game') {
-                updateUserData();
-            } else if (pageId === 'leaderboard') {
-                loadLeaderboard();
-            }
-        }
-
-        // User ma'lumotlarini yangilash (API orqali)
-        async function updateUserData() {
-            if (!currentUser) return;
-            
-            try {
-                const response = await fetch(`${API_BASE_URL}/user/${currentUser}`);
-                if (response.ok) {
-                    const user = await response.json();
-                    document.getElementById('score').textContent = user.score || 0;
-                }
-            } catch (error) {
-                console.error('Foydalanuvchi ma\'lumotlarini yuklashda xatolik:', error);
-            }
-        }
-
-        // Archani bosish - API orqali yangilash
-        async function tapTree(event) {
-            // Anti-spam: har 100ms dan keyin bitta bosish
-            const now = Date.now();
-            if (now - lastTapTime < tapDelay) return;
-            lastTapTime = now;
-            
-            if (!currentUser) return;
-            
-            try {
-                // Avval joriy ochkoni olish
-                const userResponse = await fetch(`${API_BASE_URL}/user/${currentUser}`);
-                if (!userResponse.ok) return;
-                
-                const user = await userResponse.json();
-                const newScore = (user.score || 0) + 1;
-                
-                // Ochkoni yangilash
-                const updateResponse = await fetch(`${API_BASE_URL}/update_score`, {
-                    method: 'PUT',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        username: currentUser,
-                        score: newScore
-                    })
-                });
-                
-                if (updateResponse.ok) {
-                    // Yangilash
-                    document.getElementById('score').textContent = newScore;
-                    
-                    // Effektlar yaratish
-                    if (event) {
-                        const x = event.clientX || event.touches[0].clientX;
-                        const y = event.clientY || event.touches[0].clientY;
-                        
-                        createSparkle(x, y);
-                        
-                        // YANGI: Bosilganda chiqadigan xabarlar
-                        const messages = ["🎉", "🌟", "✨", "🎄", "⛄", "🎁", "🔥", "💫"];
-                        const randomMsg = messages[Math.floor(Math.random() * messages.length)];
-                        createTapFeedback(x - 20, y - 50, randomMsg);
-                    }
-                    
-                    // Har 10 ochkoda confetti
-                    if (newScore % 10 === 0) {
-                        createConfetti();
-                    }
-                }
-            } catch (error) {
-                console.error('Ochkoni yangilashda xatolik:', error);
-            }
-        }
-
-        // Leaderboard yuklash (API orqali)
-        async function loadLeaderboard() {
-            try {
-                const response = await fetch(`${API_BASE_URL}/leaderboard`);
-                if (!response.ok) return;
-                
-                const leaderboard = await response.json();
-                let html = '';
-                
-                if (leaderboard.length === 0) {
-                    html = '<div style="text-align:center; padding:30px; color:rgba(255,255,255,0.5)">Hali hech kim o\'ynamagan</div>';
-                } else {
-                    leaderboard.forEach((user, index) => {
-                        const isCurrent = user.username === currentUser;
-                        const medal = index === 0 ? '🥇' : 
-                                     index === 1 ? '🥈' : 
-                                     index === 2 ? '🥉' : 
-                                     `${index + 1}.`;
-                        
-                        html += `
-                            <div class="leaderboard-item ${isCurrent ? 'current-user' : ''}">
-                                <div class="leaderboard-rank">${medal}</div>
-                                <div class="leaderboard-user">${user.username} ${isCurrent ? '⭐' : ''}</div>
-                                <div class="leaderboard-score">${user.score || 0} 🎄</div>
-                            </div>
-                        `;
-                    });
-                }
-                
-                document.getElementById('leaderboard-list').innerHTML = html;
-            } catch (error) {
-                console.error('Leaderboard yuklashda xatolik:', error);
-            }
-        }
-
-        // Countdown
-        function startCountdown() {
-            function updateCountdown() {
-                const now = new Date();
-                const uzTime = new Date(now.getTime() + (5 * 60 * 60 * 1000));
-                const nextYear = uzTime.getUTCFullYear() + 1;
-                const newYearDate = new Date(Date.UTC(nextYear, 0, 1, 0, 0, 0));
-                const diff = newYearDate - uzTime;
-                
-                if (diff <= 0) {
-                    document.getElementById('days').textContent = '00';
-                    document.getElementById('hours').textContent = '00';
-                    document.getElementById('minutes').textContent = '00';
-                    document.getElementById('seconds').textContent = '00';
-                    
-                    // Yangi yil tabriki
-                    if (document.getElementById('main').classList.contains('active')) {
-                        document.querySelector('.welcome-title').innerHTML = '🎉 YANGI YIL MUBORAK! 🎉';
-                        document.querySelector('.countdown-title').textContent = '🎉 Yangi Yil Keldi! 🎉';
-                    }
-                    return;
-                }
-                
-                const days = Math.floor(diff / (1000 * 60 * 60 * 24));
-                const hours = Math.floor((diff / (1000 * 60 * 60)) % 24);
-                const minutes = Math.floor((diff / (1000 * 60)) % 60);
-                const seconds = Math.floor((diff / 1000) % 60);
-                
-                document.getElementById('days').textContent = days.toString().padStart(2, '0');
-                document.getElementById('hours').textContent = hours.toString().padStart(2, '0');
-                document.getElementById('minutes').textContent = minutes.toString().padStart(2, '0');
-                document.getElementById('seconds').textContent = seconds.toString().padStart(2, '0');
-            }
-            
-            updateCountdown();
-            
-            if (countdownInterval) {
-                clearInterval(countdownInterval);
-            }
-            
-            countdownInterval = setInterval(updateCountdown, 1000);
-        }
+        if username is not None:
+            retry_after = take_token(username)
+            if retry_after is not None:
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Juda ko'p so'rov, biroz kuting"},
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+# Qabul nazorati holati: bajarilayotgan so'rovlar va ustuvorlik bo'yicha kutuvchilar (0 - yozish, 1 - o'qish)
+admission_active = 0
+admission_waiters = (deque(), deque())
+
+# So'rov ustuvorligi: ochko yozuvchi endpointlar va boshqa o'zgartirishlar GET dan oldin
+def admission_priority(method: str, path: str) -> int:
+    if method == "PUT" and path == "/update_score":
+        return 0
+    if method == "POST" and RATE_LIMITED_PATH.match(path):
+        return 0
+    return 1 if method in ("GET", "HEAD") else 0
+
+# Joy olish; navbat to'lgan yoki kutish vaqti tugagan bo'lsa False
+async def admission_acquire(priority: int) -> bool:
+    global admission_active
+    if admission_active < ADMISSION_MAX_CONCURRENT and not any(admission_waiters):
+        admission_active += 1
+        return True
+    
+    writes, reads = admission_waiters
+    if len(writes) + len(reads) >= ADMISSION_MAX_QUEUE:
+        # Navbat to'la: yozish uchun eng oxirgi kutayotgan o'qish bo'shatiladi, o'qish esa rad etiladi
+        if priority or not reads:
+            return False
+        # Bekor qilingan kutuvchi ham navbatda qolgan bo'lishi mumkin - uni chiqarish ham joy bo'shatadi
+        evicted = reads.pop()
+        if not evicted.done():
+            evicted.set_result(False)
+    
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    admission_waiters[priority].append(future)
+    wait_ms = ADMISSION_WRITE_WAIT_MS if priority == 0 else ADMISSION_READ_WAIT_MS
+    timer = loop.call_later(wait_ms / 1000, admission_expire, priority, future)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        # Joy berilgan paytda mijoz uzilsa, joy keyingisiga o'tadi
+        if not future.cancelled() and future.result():
+            admission_release()
+        elif future in admission_waiters[priority]:
+            admission_waiters[priority].remove(future)
+        raise
+    finally:
+        timer.cancel()
+
+# Kutish vaqti tugadi - joy berilmagan bo'lsa so'rov rad etiladi
+def admission_expire(priority: int, future: asyncio.Future):
+    if not future.done():
+        admission_waiters[priority].remove(future)
+        future.set_result(False)
+
+# Joyni bo'shatish: kutuvchi bo'lsa joy to'g'ridan-to'g'ri unga o'tadi, yozuvchilar birinchi
+def admission_release():
+    global admission_active
+    for waiters in admission_waiters:
+        while waiters:
+            # Shu siklda bekor qilingan kutuvchi hali navbatdan chiqmagan bo'lishi mumkin
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+    admission_active -= 1
+
+# Qabul nazorati: bir vaqtdagi so'rovlar soni cheklanadi, ortig'i qisqa kutib
+# 503 + Retry-After bilan qaytariladi (yangi yil tunidagi bosishlar to'lqini uchun)
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or ADMISSION_MAX_CONCURRENT <= 0 or scope["path"] in ADMISSION_EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+        
+        if not await admission_acquire(admission_priority(scope["method"], scope["path"])):
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server band, birozdan keyin urinib ko'ring"},
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_release()
+
+# Middleware lar teskari tartibda o'raladi: tezlik chegarasi tashqarida, shuning uchun
+# cheklangan so'rovlar qabul navbatida joy egallamaydi
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
+# Sahifalar ishga tushishda bir marta tayyorlanadi
+pages = {name: build_page(html) for name, html in build_assets().items()}
+app.mount("/static", AssetFiles(directory=STATIC_DIR), name="static")
 
-        // Chiqish
-        function logout() {
-            currentUser = null;
-            document.getElementById('app-page').style.display = 'none';
-            document.getElementById('login-page').style.display = 'flex';
-            
-            if (countdownInterval) {
-                clearInterval(countdownInterval);
-                countdownInterval = null;
-            }
-        }
+# HTML sahifani qaytarish
+@app.get("/", response_class=HTMLResponse)
+async def get_home(request: Request):
+    return page_response(request, pages["home"])
 
-        // Sahifa yuklanganda
-        window.onload = function() {
-            // Boshlang'ich sahifa sifatida kirish sahifasi ko'rsatilsin
-            showLogin();
-            createSnow();
-            
-            // Qorni yangilash
-            if (snowInterval) clearInterval(snowInterval);
-            snowInterval = setInterval(createSnow, 30000);
-            
-            // Telefon uchun optimallashtirish
-            if ('ontouchstart' in window) {
-                document.querySelector('.christmas-tree').style.cursor = 'pointer';
-            }
-            
-            // Countdown boxlarga hover effekti
-            document.querySelectorAll('.countdown-box').forEach(box => {
-                box.addEventListener('touchstart', function() {
-                    this.style.transform = 'translateY(-5px) scale(1.02)';
-                });
-                
-                box.addEventListener('touchend', function() {
-                    this.style.transform = 'translateY(0) scale(1)';
-                });
-            });
-        };
-
-        // Ekran o'lchami o'zgarganda
-        window.addEventListener('resize', createSnow);
-    </script>
-</body>
-</html>
-    """
-    return HTMLResponse(content=html_content)
+# O'yin sahifasini qaytarish
+@app.get("/game_page", response_class=HTMLResponse)
+async def get_game_page(request: Request):
+    return page_response(request, pages["game"])
 
 # API Endpointlari
 @app.post("/register")
 async def register_user(user: UserRegister):
-    if user.username in users_db:
+    if store.get(user.username) is not None:
         raise HTTPException(status_code=400, detail="Bu username band, boshqa nom tanlang")
     
     if len(user.username) < 3:
@@ -1652,133 +1672,699 @@ async def register_user(user: UserRegister):
     if len(user.password) < 4:
         raise HTTPException(status_code=400, detail="Parol kamida 4 belgidan iborat bo'lishi kerak")
     
-    users_db[user.username] = {
-        "password": user.password,
-        "score": 0,
-        "joined": datetime.now().isoformat(),
-        "last_active": datetime.now().isoformat()
-    }
-    
-    # Leaderboard ni yangilash
-    update_leaderboard(user.username, 0)
-    
-    save_data()
+    record = await submit_write(store.register, user.username, user.password, now_ts())
+    if record is None:
+        raise HTTPException(status_code=400, detail="Bu username band, boshqa nom tanlang")
     return {"message": "Foydalanuvchi muvaffaqiyatli ro'yxatdan o'tdi", "username": user.username}
 
 @app.post("/login")
 async def login_user(user: UserLogin):
-    if user.username not in users_db:
+    record = store.get(user.username)
+    if record is None:
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     
-    if users_db[user.username]["password"] != user.password:
+    if record.password != user.password:
         raise HTTPException(status_code=401, detail="Noto'g'ri parol")
     
     # Oxirgi faollik vaqtini yangilash
-    users_db[user.username]["last_active"] = datetime.now().isoformat()
-    save_data()
+    await submit_write(store.touch, user.username, now_ts())
     
     return {"message": "Kirish muvaffaqiyatli", "username": user.username}
 
+# Foydalanuvchining ochiq maydonlari (fields= bilan tanlanadi)
+def user_public(username: str, record: UserRecord, fields: tuple = USER_FIELDS) -> dict:
+    row = {}
+    for field in fields:
+        if field == "username":
+            row["username"] = username
+        elif field == "score":
+            row["score"] = record.score
+        elif field == "version":
+            row["version"] = record.version
+        else:
+            row[field] = format_ts(getattr(record, field))
+    return row
+
+# fields= parametrini tekshirish
+def parse_fields(fields: Optional[str]) -> tuple:
+    if fields is None:
+        return USER_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in USER_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Noma'lum maydon: {', '.join(unknown)}")
+    return selected
+
 @app.get("/users")
-async def get_all_users():
-    users_list = []
-    for username, data in users_db.items():
-        users_list.append({
-            "username": username,
-            "score": data.get("score", 0),
-            "joined": data.get("joined"),
-            "last_active": data.get("last_active")
-        })
-    return users_list
+async def get_all_users(request: Request, response: Response,
+                        limit: Optional[int] = None, cursor: Optional[str] = None,
+                        fields: Optional[str] = None, format: Optional[str] = None):
+    selected = parse_fields(fields)
+    
+    # Kursor - ro'yxatdan o'tish tartibidagi pozitsiya, yangi foydalanuvchilar faqat oxiriga qo'shiladi
+    try:
+        start = int(cursor) if cursor is not None else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Noto'g'ri kursor")
+    if start < 0:
+        raise HTTPException(status_code=400, detail="Noto'g'ri kursor")
+    if limit is not None and (limit < 1 or limit > MAX_USERS_PAGE):
+        raise HTTPException(status_code=400, detail=f"limit 1 dan {MAX_USERS_PAGE} gacha bo'lishi kerak")
+    
+    # Birorta foydalanuvchi o'zgarmagan bo'lsa har qanday sahifa ham o'zgarmagan
+    view = read_view
+    cached = not_modified(request, response, view.users_etag)
+    if cached is not None:
+        return cached
+    
+    if format == "ndjson":
+        stop = start + limit if limit is not None else None
+        
+        # Qatorlar generatordan bo'lak-bo'lak yuboriladi - butun ro'yxat xotirada yig'ilmaydi
+        def rows():
+            position = start
+            while stop is None or position < stop:
+                end = min(position + NDJSON_CHUNK, store.count())
+                if stop is not None:
+                    end = min(end, stop)
+                if position >= end:
+                    break
+                yield "".join(
+                    json.dumps(user_public(username, record, selected), ensure_ascii=False, separators=(',', ':')) + "\n"
+                    for username, record in store.page(position, end)
+                )
+                position = end
+        
+        return StreamingResponse(rows(), media_type="application/x-ndjson", headers=dict(response.headers))
+    
+    # Bir xil sahifa shu ko'rinish davomida bir marta yig'iladi
+    key = (start, limit, cursor is None, selected)
+    body = view.pages.get(key)
+    if body is None:
+        if limit is None and cursor is None:
+            # Eski mijozlar uchun to'liq ro'yxat
+            body = json_bytes([user_public(username, record, selected)
+                               for username, record in store.page(0, store.count())])
+        else:
+            stop = start + (limit or USERS_PAGE_SIZE)
+            page = [user_public(username, record, selected) for username, record in store.page(start, stop)]
+            next_cursor = str(stop) if stop < store.count() else None
+            body = json_bytes({"users": page, "next_cursor": next_cursor})
+        if len(view.pages) < VIEW_PAGE_CACHE_SIZE:
+            view.pages[key] = body
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+@app.get("/stats")
+async def get_stats():
+    return Response(content=read_view.stats_body, media_type="application/json")
+
+# Statistikani hisoblash - o'qish ko'rinishi e'lon qilinganda chaqiriladi
+def compute_stats() -> dict:
+    # Faollik oynasidan chiqqanlarni boshidan olib tashlash - amortizatsiyalangan O(1)
+    cutoff = time.time() - ACTIVE_WINDOW_MINUTES * 60
+    while recent_activity:
+        username, last_seen = next(iter(recent_activity.items()))
+        if last_seen >= cutoff:
+            break
+        recent_activity.popitem(last=False)
+    # Shared rejimda boshqa ishchilardagi faollik ham hisobga kirishi uchun ombordan sanaladi
+    active_users = store.active_count(int(cutoff)) if store.shared else len(recent_activity)
+    
+    top_user, top_score = leaderboard_rows[0] if leaderboard_rows else (None, 0)
+    return {
+        "users": store.count(),
+        "top_user": top_user,
+        "top_score": top_score,
+        "total_taps": store.total_score(),
+        "active_users": active_users,
+        "active_window_minutes": ACTIVE_WINDOW_MINUTES
+    }
 
 @app.get("/user/{username}")
-async def get_user(username: str):
-    if username not in users_db:
+async def get_user(username: str, request: Request):
+    # Shared rejimda boshqa ishchi yozgan bo'lishi mumkin - har safar ombordan
+    entry = None if store.shared else user_views.get(username)
+    if entry is not None:
+        user_views.move_to_end(username)
+    else:
+        record = store.get(username)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
+        # Ro'yxatdan endi o'tgan, hali e'lon qilinmagan foydalanuvchi
+        entry = user_entry(username, record) if store.shared else publish_user(username, record)
+    
+    # O'zgarmagan foydalanuvchi uchun tanasiz 304, aks holda tayyor baytlar
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Foydalanuvchi o'zgarganini qayd etish - keyingi o'qish ko'rinishida qayta e'lon qilinadi
+def user_changed(username: str):
+    dirty_users.add(username)
+
+# Qayta ishga tushgandan keyin faollik ro'yxatini saqlangan last_active dan tiklash - aks holda
+# /stats oyna tugaguncha 0 faol ko'rsatadi. Tartib saqlanadi, shunda boshidan o'chirish ishlayveradi.
+def load_recent_activity():
+    recent_activity.clear()
+    for username, last_active in store.active_since(now_ts() - ACTIVE_WINDOW_MINUTES * 60):
+        recent_activity[username] = last_active
+
+# Foydalanuvchini faol deb belgilash - eng oxirgi faollar ro'yxat oxirida turadi
+def mark_active(username: str):
+    recent_activity[username] = time.time()
+    recent_activity.move_to_end(username)
+
+# O'zgartirishni yozuvchi navbatiga qo'yib natijasini kutish. method - ombor metodi,
+# birinchi argument username; natija yozuvning nusxasi (yoki rad etilganda None).
+async def submit_write(method, *args) -> Optional[UserRecord]:
+    future = asyncio.get_running_loop().create_future()
+    write_queue.put_nowait((method, args, future))
+    return await future
+
+# Bitta to'plamni qo'llash: ombor uni bitta tranzaksiya va bitta indeks yangilanishi bilan yozadi,
+# o'qish ko'rinishi, faollik va TOP 10 esa to'plam oxirida bir marta yangilanadi
+def apply_write_batch(batch: list):
+    results = []
+    changed = {}
+    try:
+        with store.batch():
+            for method, args, future in batch:
+                try:
+                    record = method(*args)
+                except Exception as e:
+                    results.append((future, None, e))
+                    continue
+                if record is not None:
+                    changed[args[0]] = record.score
+                    record = record.copy()
+                results.append((future, record, None))
+    except Exception as e:
+        # To'plam diskka tushmadi - hech bir so'rovga muvaffaqiyat qaytarilmaydi
+        results = [(future, None, e) for future, _, _ in results]
+    
+    for username in changed:
+        user_changed(username)
+        mark_active(username)
+    update_leaderboard(changed)
+    return results
+
+def resolve_writes(results: list):
+    for future, record, error in results:
+        # Mijoz uzilgan bo'lsa future bekor qilingan
+        if future.done():
+            continue
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(record)
+
+# Fon vazifasi: yagona yozuvchi. Navbatda nechta o'zgartirish yig'ilgan bo'lsa
+# (WRITE_BATCH_SIZE gacha) hammasini bitta to'plam qilib qo'llaydi.
+async def writer_loop():
+    while True:
+        batch = [await write_queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE and not write_queue.empty():
+            batch.append(write_queue.get_nowait())
+        results = apply_write_batch(batch)
+        try:
+            # SqliteStore always rejimida batch() ichida commit qilgan; xotira ombori shu yerda fsync qiladi
+            await store.persist_batch()
+        except Exception as e:
+            results = [(future, None, e) for future, _, _ in results]
+        resolve_writes(results)
+        # Navbat bo'shamasa ham o'quvchilar va natijani kutayotgan handlerlar navbat olsin
+        await asyncio.sleep(0)
+
+# To'xtashda navbatda qolgan o'zgartirishlarni qo'llash
+def drain_writes():
+    while write_queue is not None and not write_queue.empty():
+        batch = []
+        while len(batch) < WRITE_BATCH_SIZE and not write_queue.empty():
+            batch.append(write_queue.get_nowait())
+        # Yakuniy flush shundan keyin keladi
+        resolve_writes(apply_write_batch(batch))
+
+# Bosishlar to'plamini tezlik chegarasiga qarab tekshirish
+def validate_tap_batch(username: str, batch: TapBatch):
+    duration = batch.window_end - batch.window_start
+    if batch.count < 1 or duration < 0 or duration > MAX_TAP_WINDOW_MS:
+        raise HTTPException(status_code=400, detail="Bosishlar to'plami noto'g'ri")
+    
+    # Oyna chegaralaridagi ikkala bosish ham hisobga kiradi. Bu +1 faqat birinchi to'plamga tegishli -
+    # keyingilari check_tap_window da oldingi oyna oxiridan beri o'tgan vaqtga qarab tekshiriladi
+    if batch.count > duration * MAX_TAPS_PER_SECOND // 1000 + 1:
+        raise HTTPException(status_code=429, detail="Bosish tezligi juda yuqori")
+    
+    now_ms = int(time.time() * 1000)
+    if store.shared:
+        # Ishchilar oynani bitta jadvalda tekshirib yozadi - bir xil oyna turli ishchilarga yuborilsa
+        # ham faqat bittasi qabul qilinadi
+        state = store.claim_tap_window(username, batch.window_start, batch.window_end, batch.count,
+                                       MAX_TAPS_PER_SECOND, now_ms, now_ms + TAP_CLOCK_TOLERANCE_MS)
+        if state is not None:
+            check_tap_window(batch, state, now_ms)
+            # Oraliqda boshqa ishchi yangilagan
+            raise HTTPException(status_code=400, detail="Bosishlar oynasi oldingisi bilan ustma-ust")
+        return
+    
+    now = time.monotonic()
+    evict_idle(tap_windows, TAP_WINDOW_IDLE_SECONDS, now)
+    state = tap_windows.get(username)
+    if state is not None:
+        check_tap_window(batch, state, now_ms)
+        tap_windows.move_to_end(username)
+        tap_windows[username] = [state[0], batch.window_end, now]
+    else:
+        if len(tap_windows) >= TAP_WINDOW_MAX_ENTRIES:
+            # Faol o'yinchining oynasini o'chirish unga yangi "birinchi" to'plam berardi
+            raise HTTPException(status_code=503, detail="Server band, keyinroq urinib ko'ring",
+                                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
+        tap_windows[username] = [now_ms - batch.window_end, batch.window_end, now]
+
+# state: (soat farqi, oldingi oyna oxiri, ...)
+def check_tap_window(batch: TapBatch, state, now_ms: int):
+    offset, last_end = state[0], state[1]
+    # Oynalar bir-birini qoplamasligi kerak - aks holda bosishlar ikki marta sanaladi
+    if batch.window_start <= last_end:
+        raise HTTPException(status_code=400, detail="Bosishlar oynasi oldingisi bilan ustma-ust")
+    # Har to'plam oldingi oyna oxiridan beri o'tgan vaqtdan olinadi - aks holda har oynaning
+    # chegara bosishi (+1) nol kenglikdagi oynalar bilan cheksiz yig'ilardi
+    if batch.count > (batch.window_end - last_end) * MAX_TAPS_PER_SECOND // 1000:
+        raise HTTPException(status_code=429, detail="Bosish tezligi juda yuqori")
+    # Mijoz soati server vaqtidan oldinga qochib ketmasligi kerak
+    if batch.window_end + offset > now_ms + TAP_CLOCK_TOLERANCE_MS:
+        raise HTTPException(status_code=429, detail="Bosish tezligi juda yuqori")
+
+# Foydalanuvchi o'rni va keyingi o'ringacha qolgan ochko
+def rank_info(username: str, record: UserRecord) -> dict:
+    score = record.score
+    index, start, rows = store.neighbors(username, score, 1, 0)
+    gap = None
+    if start < index:
+        # Tenglikda username bo'yicha oldinda turgan o'yinchini ham ortda qoldirish kerak
+        _, above_score = rows[0]
+        gap = above_score - score + 1
+    return {"username": username, "rank": index + 1, "score": score, "gap": gap}
+
+@app.get("/user/{username}/rank")
+async def get_user_rank(username: str):
+    record = store.get(username)
+    if record is None:
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     
-    return {
-        "username": username,
-        "score": users_db[username].get("score", 0),
-        "joined": users_db[username].get("joined"),
-        "last_active": users_db[username].get("last_active")
-    }
+    return rank_info(username, record)
+
+@app.post("/users/ranks")
+async def get_user_ranks(request: UsernameList):
+    if len(request.usernames) > MAX_BULK_RANKS:
+        raise HTTPException(status_code=400, detail=f"Bir so'rovda ko'pi bilan {MAX_BULK_RANKS} ta foydalanuvchi")
+    
+    ranks = []
+    not_found = []
+    for username in request.usernames:
+        record = store.get(username)
+        if record is not None:
+            ranks.append(rank_info(username, record))
+        else:
+            not_found.append(username)
+    return {"ranks": ranks, "not_found": not_found}
+
+@app.get("/leaderboard/around/{username}")
+async def get_leaderboard_around(username: str, k: int = 5):
+    record = store.get(username)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
+    
+    if k < 1 or k > MAX_AROUND:
+        raise HTTPException(status_code=400, detail=f"k 1 dan {MAX_AROUND} gacha bo'lishi kerak")
+    
+    # Indeksdan foydalanuvchidan k ta yuqori va k ta pastdagi o'yinchilarni olish
+    index, start, rows = store.neighbors(username, record.score, k, k)
+    players = []
+    for offset, (name, score) in enumerate(rows):
+        players.append({"rank": start + offset + 1, "username": name, "score": score})
+    return {"username": username, "rank": index + 1, "players": players}
+
+# Versiya mos kelmadi: mijoz qayta GET qilmasdan davom etishi uchun joriy holat qaytariladi
+def version_conflict(username: str, record: UserRecord) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Foydalanuvchi boshqa so'rov bilan o'zgargan", "user": user_public(username, record)},
+        headers={"ETag": f'"{record.version}"'}
+    )
 
 @app.put("/update_score")
-async def update_user_score(user_score: UserScore):
-    if user_score.username not in users_db:
+async def update_user_score(user_score: UserScore, request: Request, response: Response):
+    username = user_score.username
+    current = store.get(username)
+    if current is None:
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     
-    # Eski ochkoni saqlab qo'yish
-    old_score = users_db[user_score.username].get("score", 0)
+    # Optimistik parallellik: If-Match (GET /user/{username} ETag i) yoki expected_version.
+    # If-Match joriy versiyaga mos kelsa, yozish aynan shu versiyaga shart qilib qo'yiladi.
+    expected_version = user_score.expected_version
+    if_match = request.headers.get("if-match")
+    if if_match is not None:
+        if not if_match_matches(if_match, f'"{current.version}"'):
+            raise version_conflict(username, current)
+        if expected_version is None and if_match.strip() != "*":
+            expected_version = current.version
     
-    # Agar yangi ochko eski ochkodan kichik bo'lsa, yangilamaymiz
-    if user_score.score < old_score:
+    # Agar yangi ochko eski ochkodan kichik bo'lsa yoki versiya o'zgargan bo'lsa, ombor yangilamaydi
+    record = await submit_write(store.set_score, username, user_score.score, now_ts(), expected_version)
+    if record is None:
+        current = store.get(username)
+        if expected_version is not None and current.version != expected_version:
+            raise version_conflict(username, current)
         raise HTTPException(status_code=400, detail="Yangi ochko eski ochkodan kichik bo'lishi mumkin emas")
     
-    users_db[user_score.username]["score"] = user_score.score
-    users_db[user_score.username]["last_active"] = datetime.now().isoformat()
-    
-    # Leaderboard ni yangilash
-    update_leaderboard(user_score.username, user_score.score)
+    response.headers["ETag"] = f'"{record.version}"'
+    return {"message": "Ochko muvaffaqiyatli yangilandi", "username": username, "score": record.score,
+            "version": record.version}
+
+@app.post("/user/{username}/increment")
+async def increment_user_score(username: str):
+    if store.get(username) is None:
+        raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     
-    save_data()
-    return {"message": "Ochko muvaffaqiyatli yangilandi", "username": user_score.username, "score": user_score.score}
+    # Oshirish omborda bitta amal - atomar
+    score = (await submit_write(store.add_score, username, 1, now_ts())).score
+    return {"message": "Ochko oshirildi", "username": username, "score": score}
 
-@app.get("/leaderboard")
-async def get_leaderboard():
-    # Leaderboard ma'lumotlarini tayyorlash
-    leaderboard = []
-    for username, data in users_db.items():
-        leaderboard.append({
-            "username": username,
-            "score": data.get("score", 0),
-            "joined": data.get("joined")
-        })
+@app.post("/user/{username}/taps")
+async def submit_taps(username: str, batch: TapBatch):
+    if store.get(username) is None:
+        raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     
-    # Ochko bo'yicha kamayish tartibida saralash
-    leaderboard.sort(key=lambda x: x["score"], reverse=True)
+    validate_tap_batch(username, batch)
+    score = (await submit_write(store.add_score, username, batch.count, now_ts())).score
+    return {"message": "Bosishlar qabul qilindi", "username": username, "score": score, "accepted": batch.count}
+
+# O'yin kanali: mijoz har bosishni kichik kadr ("1") sifatida yuboradi,
+# server ochko va o'rinni vaqti-vaqti bilan o'zi qaytaradi
+@app.websocket("/ws/game")
+async def game_socket(websocket: WebSocket, username: str):
+    if store.get(username) is None:
+        await websocket.close(code=1008)
+        return
     
-    # Faqat TOP 10 ni qaytarish
-    return leaderboard[:10]
-
-# Leaderboard ni yangilash funksiyasi
-def update_leaderboard(username: str, score: int):
-    global leaderboard_data
+    await websocket.accept()
+    received = 0  # Ulanish davomida kelgan bosishlar
+    rejected = 0  # Tezlik chegarasidan oshgani uchun tashlanganlari
+    dirty = True
     
-    # Mavjud foydalanuvchini topish
-    user_index = -1
-    for i, user in enumerate(leaderboard_data):
-        if user["username"] == username:
-            user_index = i
-            break
+    async def ack_loop():
+        nonlocal dirty
+        while True:
+            if dirty:
+                dirty = False
+                ack = rank_info(username, store.get(username))
+                ack["received"] = received
+                ack["rejected"] = rejected
+                await websocket.send_json(ack)
+            await asyncio.sleep(WS_ACK_INTERVAL_MS / 1000)
     
-    # Yangi foydalanuvchi qo'shish yoki yangilash
-    user_data = {
-        "username": username,
-        "score": score,
-        "updated": datetime.now().isoformat()
-    }
+    sender = asyncio.create_task(ack_loop())
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            try:
+                count = int(frame)
+            except ValueError:
+                continue
+            if count < 1:
+                continue
+            received += count
+            dirty = True
+            
+            # Bosish byudjeti foydalanuvchiga bitta - bir nechta ulanish ochish chegarani oshirmaydi
+            accepted = take_taps(username, count)
+            rejected += count - accepted
+            if accepted:
+                await submit_write(store.add_score, username, accepted, now_ts())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+
+@app.get("/leaderboard/stream")
+async def stream_leaderboard():
+    if not stream_snapshot:
+        broadcast_leaderboard()
     
-    if user_index >= 0:
-        leaderboard_data[user_index] = user_data
-    else:
-        leaderboard_data.append(user_data)
+    # Yangi obunachi oxirgi tarqatilgan holatdan boshlaydi, keyingi farqlar shunga nisbatan
+    queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+    queue.put_nowait(stream_snapshot)
+    leaderboard_subscribers.add(queue)
     
-    # Ochko bo'yicha saralash
-    leaderboard_data.sort(key=lambda x: x["score"], reverse=True)
+    async def events():
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            leaderboard_subscribers.discard(queue)
     
-    # Faqat 10 ta eng yaxshisini saqlash
-    leaderboard_data = leaderboard_data[:10]
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Mijozga beriladigan versiya: "BOOT_ID.raqam". Raqam jarayon qayta ishga tushganda noldan
+# boshlanadi, shuning uchun boshqa jarayon bergan versiya bilan solishtirib bo'lmaydi.
+def leaderboard_token(version: int) -> str:
+    return f"{BOOT_ID}.{version}"
+
+# Mijoz versiyasidagi raqam; boshqa jarayonniki, eski (faqat raqam) yoki buzuq bo'lsa None
+def parse_leaderboard_token(token: str) -> Optional[int]:
+    boot_id, _, version = token.rpartition(".")
+    if boot_id != BOOT_ID or not version.isdigit():
+        return None
+    return int(version)
+
+@app.get("/leaderboard")
+async def get_leaderboard(request: Request, since: Optional[str] = None):
+    if since is not None:
+        # O'zgarish bo'lmasa bo'sh 304, aks holda faqat o'zgargan qatorlar.
+        # Versiya boshqa jarayonniki yoki hozirgisidan katta bo'lsa hammasi qaytariladi.
+        version = parse_leaderboard_token(since)
+        if version == leaderboard_version:
+            return Response(status_code=304)
+        return leaderboard_changes(version if version is not None and version < leaderboard_version else 0)
+    
+    # TOP 10 o'qish ko'rinishida tayyor baytlar ko'rinishida turadi
+    view = read_view
+    headers = {
+        "ETag": view.leaderboard_etag,
+        "Cache-Control": "no-cache",
+        "X-Leaderboard-Version": leaderboard_token(view.leaderboard_version)
+    }
+    if etag_matches(request.headers.get("if-none-match"), view.leaderboard_etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=view.leaderboard_body, media_type="application/json", headers=headers)
+
+def json_bytes(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# O'zgarmas o'qish ko'rinishi. E'lon qilingandan keyin maydonlari o'zgartirilmaydi,
+# faqat pages keshi to'ldiriladi; yangi holat yangi obyekt bo'lib almashtiriladi.
+class ReadView:
+    __slots__ = ("leaderboard_version", "leaderboard_body", "leaderboard_etag",
+                 "users_version", "users_etag", "stats_body", "stats_time", "pages")
+
+    def __init__(self, previous: Optional["ReadView"], users_version: int):
+        self.leaderboard_version = leaderboard_version
+        if previous is not None and previous.leaderboard_version == leaderboard_version:
+            self.leaderboard_body = previous.leaderboard_body
+        else:
+            self.leaderboard_body = json_bytes([
+                {"username": username, "score": score, "joined": format_ts(store.get(username).joined)}
+                for username, score in leaderboard_rows
+            ])
+        self.leaderboard_etag = f'"{BOOT_ID}.{leaderboard_version}"'
+        self.users_version = users_version
+        self.users_etag = f'"{BOOT_ID}.{users_version}"'
+        self.stats_body = json_bytes(compute_stats())
+        self.stats_time = time.monotonic()
+        # Foydalanuvchilar o'zgarmagan bo'lsa tayyor sahifalar yangi ko'rinishda ham to'g'ri
+        if previous is not None and previous.users_version == users_version:
+            self.pages = previous.pages
+        else:
+            self.pages = {}
+
+# Bitta foydalanuvchining javobi: (ETag, JSON baytlari)
+def user_entry(username: str, record: UserRecord) -> tuple:
+    return (f'"{record.version}"', json_bytes(user_public(username, record)))
+
+# Bitta foydalanuvchining tayyor javobini keshga qo'yish; eng kam o'qilgani chiqarib yuboriladi
+def publish_user(username: str, record: UserRecord) -> tuple:
+    entry = user_entry(username, record)
+    user_views[username] = entry
+    if len(user_views) > USER_VIEW_CACHE_SIZE:
+        user_views.popitem(last=False)
+    return entry
+
+# Yangi o'qish ko'rinishini e'lon qilish - havolani almashtirish atomar
+def publish_read_view():
+    global read_view, dirty_users
+    if not store.shared:
+        # Faqat keshdagilar yangilanadi - o'qilmagan foydalanuvchi birinchi o'qishda tayyorlanadi
+        for username in dirty_users:
+            if username in user_views:
+                user_views[username] = user_entry(username, store.get(username))
+    view = read_view
+    users_version = store.changes()
+    if store.shared and (view is None or view.users_version != users_version):
+        # Boshqa ishchilar yozgan bo'lishi mumkin - TOP 10 ni ombor bilan moslash
+        refresh_leaderboard_rows()
+    # Yozuv bo'lmasa ham faollik oynasi siljiydi - statistika vaqti-vaqti bilan qayta hisoblanadi
+    if view is None or view.users_version != users_version or view.leaderboard_version != leaderboard_version \
+            or time.monotonic() - view.stats_time >= STATS_REFRESH_SECONDS:
+        read_view = ReadView(view, users_version)
+    # Xatolikda o'zgarganlar ro'yxati saqlanadi - keyingi davr ularni qayta e'lon qiladi
+    dirty_users = set()
+
+# Fon vazifasi: o'qish ko'rinishini qisqa davr bilan yangilash
+async def read_view_loop():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_MS / 1000)
+        # Bitta xato (masalan shared rejimda band baza) vazifani to'xtatmasligi kerak - keyingi davr qayta uradi
+        try:
+            publish_read_view()
+        except Exception as e:
+            print(f"O'qish ko'rinishini yangilashda xatolik: {e}")
+
+# SSE xabarini tayyorlash
+def sse_message(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n".encode('utf-8')
+
+def leaderboard_row(index: int, username: str, score: int) -> dict:
+    return {"rank": index + 1, "username": username, "score": score}
+
+# Berilgan versiyadan keyin o'zgargan TOP 10 qatorlari
+def leaderboard_changes(since: int) -> dict:
+    rows = []
+    for index, row in enumerate(leaderboard_rows):
+        if leaderboard_row_versions[index] > since:
+            rows.append(leaderboard_row(index, *row))
+    return {"version": leaderboard_token(leaderboard_version), "rows": rows, "size": len(leaderboard_rows)}
+
+# TOP 10 o'zgargan bo'lsa farqni bir marta hisoblab barcha obunachilarga yuborish
+def broadcast_leaderboard():
+    global stream_version, stream_snapshot
+    if stream_snapshot and stream_version == leaderboard_version:
+        return
+    diff = sse_message("diff", leaderboard_changes(stream_version))
+    stream_snapshot = sse_message("snapshot", leaderboard_changes(0))
+    stream_version = leaderboard_version
+    for queue in list(leaderboard_subscribers):
+        if queue.full():
+            # Sekin mijoz farqlarni o'tkazib yuborgan - to'liq snapshot bilan qayta sinxronlash
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(stream_snapshot)
+        else:
+            queue.put_nowait(diff)
+
+# Fon vazifasi: jonli leaderboard farqlarini tarqatish
+async def leaderboard_broadcast_loop():
+    while True:
+        await asyncio.sleep(LEADERBOARD_PUSH_INTERVAL_MS / 1000)
+        if leaderboard_subscribers:
+            try:
+                broadcast_leaderboard()
+            except Exception as e:
+                print(f"Leaderboard ni tarqatishda xatolik: {e}")
+
+# Leaderboard ni yangilash funksiyasi - to'plamdagi o'zgargan ochkolar bo'yicha (username -> ochko)
+def update_leaderboard(scores: Dict[str, int]):
+    # Shared rejimda TOP 10 o'qish ko'rinishi bilan birga ombordan moslanadi
+    if store.shared or not scores:
+        return
+    # TOP 10 ga tegmaydigan o'zgarishda qatorlarni qayta hisoblash shart emas, tegsa ham bir marta
+    if len(leaderboard_rows) < LEADERBOARD_SIZE:
+        refresh_leaderboard_rows()
+        return
+    last = rank_key(leaderboard_rows[-1])
+    top_users = {row[0] for row in leaderboard_rows}
+    for username, score in scores.items():
+        if (-score, username) < last or username in top_users:
+            refresh_leaderboard_rows()
+            return
+
+# TOP 10 ni ombor reytingidan olib, o'zgargan qatorlar bo'lsa versiyani oshirish
+def refresh_leaderboard_rows():
+    global leaderboard_rows, leaderboard_version
+    if store.shared:
+        leaderboard_version, leaderboard_rows, versions = store.sync_leaderboard(LEADERBOARD_SIZE)
+        leaderboard_row_versions[:] = versions
+        return
+    rows = store.range(0, LEADERBOARD_SIZE)
+    if rows == leaderboard_rows:
+        return
+    leaderboard_version += 1
+    leaderboard_row_versions[:] = next_row_versions(leaderboard_rows, leaderboard_row_versions, rows, leaderboard_version)
+    leaderboard_rows = rows
+
+# O'zgargan va yangi qo'shilgan qatorlar yangi versiyani oladi, qolganlari eskisini saqlaydi
+def next_row_versions(old_rows: List[tuple], old_versions: List[int], rows: List[tuple], version: int) -> List[int]:
+    versions = old_versions[:len(rows)]
+    for index, row in enumerate(rows):
+        if index >= len(old_rows) or old_rows[index] != row:
+            if index < len(versions):
+                versions[index] = version
+            else:
+                versions.append(version)
+    return versions
 
 # Ilova ishga tushganda ma'lumotlarni yuklash
 @app.on_event("startup")
 async def startup_event():
-    load_data()
+    global write_queue
+    store.load()
+    if not store.shared:
+        load_recent_activity()
+    refresh_leaderboard_rows()
+    publish_read_view()
+    write_queue = asyncio.Queue()
+    background_tasks.append(asyncio.create_task(writer_loop()))
+    background_tasks.append(asyncio.create_task(read_view_loop()))
+    background_tasks.append(asyncio.create_task(flusher_loop()))
+    background_tasks.append(asyncio.create_task(leaderboard_broadcast_loop()))
+    background_tasks.append(asyncio.create_task(maintenance_loop()))
     print("Yangi Yil Konkursi API ishga tushdi!")
-    print(f"Jami foydalanuvchilar: {len(users_db)}")
+    print(f"Jami foydalanuvchilar: {store.count()}")
     print(f"API hujjatlariga kirish: http://localhost:8000/docs")
     print(f"O'yin sahifasi: http://localhost:8000/game_page")
 
+# Ilova to'xtaganda oxirgi o'zgarishlarni diskka yozish
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    drain_writes()
+    await store.flush(final=True)
+    store.close()
+
 if __name__ == "__main__":
+    if sys.argv[1:] == ["build"]:
+        # Faqat assetlarni yig'ish: python app.py build
+        print(f"Assetlar yig'ildi: {STATIC_DIR}")
+        sys.exit(0)
+    
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if WORKERS > 1:
+        # Ishchilar holatni faqat umumiy SQLite ombori orqali bo'lishadi
+        if STORE != "sqlite":
+            print("WORKERS > 1 bo'lsa STORE=sqlite bo'lishi kerak")
+            sys.exit(1)
+        # Sxema va eski fayllarni ko'chirish ishchilar ishga tushishidan oldin bir marta bajariladi
+        store.load()
+        store.close()
+        os.environ["BOOT_ID"] = BOOT_ID
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=WORKERS, app_dir=BASE_DIR)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,635 @@
+// API URL - o'zgartirilgan
+const API_BASE_URL = window.location.origin;
+
+// Global o'zgaruvchilar
+let currentUser = null;
+let countdownInterval = null;
+let snowInterval = null;
+let lastTapTime = 0;
+const tapDelay = 100; // 100ms delay between taps
+const tapFlushDelay = 500; // Yig'ilgan bosishlar shuncha ms da bir yuboriladi
+let serverScore = 0;
+let pendingTaps = 0;
+let tapWindowStart = 0;
+let tapWindowEnd = 0;
+let tapFlushTimer = null;
+let tapFlushInFlight = false;
+let gameSocket = null;
+let socketSent = 0; // WebSocket orqali yuborilgan bosishlar
+let leaderboardStream = null;
+let leaderboardRows = [];
+
+// Qor effekti yaratish
+function createSnow() {
+    const snow = document.getElementById('snow');
+    snow.innerHTML = '';
+
+    for (let i = 0; i < 50; i++) {
+        const snowflake = document.createElement('div');
+        snowflake.classList.add('snowflake');
+
+        const size = Math.random() * 5 + 3;
+        const left = Math.random() * 100;
+        const opacity = Math.random() * 0.6 + 0.4;
+        const duration = Math.random() * 10 + 10;
+
+        snowflake.style.width = `${size}px`;
+        snowflake.style.height = `${size}px`;
+        snowflake.style.left = `${left}%`;
+        snowflake.style.opacity = opacity;
+        snowflake.style.animationDuration = `${duration}s`;
+        snowflake.style.animationDelay = `${Math.random() * 5}s`;
+
+        snow.appendChild(snowflake);
+    }
+}
+
+// Chayqalish effekti
+function createSparkle(x, y) {
+    const sparkle = document.createElement('div');
+    sparkle.classList.add('sparkle');
+    sparkle.style.left = `${x}px`;
+    sparkle.style.top = `${y}px`;
+
+    document.body.appendChild(sparkle);
+
+    setTimeout(() => {
+        sparkle.remove();
+    }, 500);
+}
+
+// YANGI: Bosilganda chiqadigan xabar
+function createTapFeedback(x, y, text) {
+    const feedback = document.createElement('div');
+    feedback.classList.add('tap-feedback');
+    feedback.textContent = text;
+    feedback.style.left = `${x}px`;
+    feedback.style.top = `${y}px`;
+
+    document.body.appendChild(feedback);
+
+    setTimeout(() => {
+        feedback.remove();
+    }, 1000);
+}
+
+// Confetti effekti
+function createConfetti() {
+    const colors = ['#FF3366', '#33CCFF', '#FFCC00', '#00D4A4', '#FF9966'];
+
+    for (let i = 0; i < 30; i++) {
+        const confetti = document.createElement('div');
+        confetti.classList.add('confetti');
+        confetti.style.backgroundColor = colors[Math.floor(Math.random() * colors.length)];
+        confetti.style.left = `${Math.random() * 100}vw`;
+        confetti.style.top = `-10px`;
+
+        const size = Math.random() * 10 + 5;
+        confetti.style.width = `${size}px`;
+        confetti.style.height = `${size}px`;
+        confetti.style.borderRadius = Math.random() > 0.5 ? '50%' : '0';
+
+        document.body.appendChild(confetti);
+
+        // Animatsiya
+        const animation = confetti.animate([
+            { transform: `translateY(0) rotate(0deg)`, opacity: 1 },
+            { transform: `translateY(${window.innerHeight}px) rotate(${Math.random() * 360}deg)`, opacity: 0 }
+        ], {
+            duration: Math.random() * 2000 + 1000,
+            easing: 'cubic-bezier(0.215, 0.610, 0.355, 1)'
+        });
+
+        animation.onfinish = () => confetti.remove();
+    }
+}
+
+// YANGI: Countdown animatsiyasi
+function animateCountdown(elementId) {
+    const element = document.getElementById(elementId);
+    const box = element.closest('.countdown-box');
+
+    // Animatsiya qo'shish
+    box.classList.add('countdown-animation');
+
+    // Animatsiyani tozalash
+    setTimeout(() => {
+        box.classList.remove('countdown-animation');
+    }, 500);
+
+    // Ovoz effekti (agar ruxsat bo'lsa)
+    try {
+        const audioContext = new (window.AudioContext || window.webkitAudioContext)();
+        const oscillator = audioContext.createOscillator();
+        const gainNode = audioContext.createGain();
+
+        oscillator.connect(gainNode);
+        gainNode.connect(audioContext.destination);
+
+        oscillator.frequency.value = 800;
+        oscillator.type = 'sine';
+
+        gainNode.gain.setValueAtTime(0.3, audioContext.currentTime);
+        gainNode.gain.exponentialRampToValueAtTime(0.01, audioContext.currentTime + 0.1);
+
+        oscillator.start(audioContext.currentTime);
+        oscillator.stop(audioContext.currentTime + 0.1);
+    } catch (e) {
+        console.log('Audio context not supported');
+    }
+}
+
+// Sahifalarni ko'rsatish
+function showRegister() {
+    document.getElementById('login-page').style.display = 'none';
+    document.getElementById('register-page').style.display = 'flex';
+    document.getElementById('app-page').style.display = 'none';
+}
+
+function showLogin() {
+    document.getElementById('register-page').style.display = 'none';
+    document.getElementById('login-page').style.display = 'flex';
+    document.getElementById('app-page').style.display = 'none';
+}
+
+// Ro'yxatdan o'tish (API orqali)
+async function register() {
+    const username = document.getElementById('reg-username').value.trim();
+    const password = document.getElementById('reg-password').value.trim();
+    const message = document.getElementById('register-message');
+
+    if (!username || !password) {
+        showMessage(message, 'Iltimos, barcha maydonlarni to\'ldiring', 'error');
+        return;
+    }
+
+    if (username.length < 3) {
+        showMessage(message, 'Username kamida 3 belgidan iborat bo\'lishi kerak', 'error');
+        return;
+    }
+
+    if (password.length < 4) {
+        showMessage(message, 'Parol kamida 4 belgidan iborat bo\'lishi kerak', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/register`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ username, password })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            showMessage(message, '✅ Ro\'yxatdan o\'tdingiz! Endi kirishingiz mumkin', 'success');
+            createConfetti();
+
+            setTimeout(() => {
+                showLogin();
+                document.getElementById('login-username').value = username;
+                document.getElementById('reg-username').value = '';
+                document.getElementById('reg-password').value = '';
+                message.innerHTML = '';
+            }, 2000);
+        } else {
+            showMessage(message, data.detail || 'Xatolik yuz berdi', 'error');
+        }
+    } catch (error) {
+        showMessage(message, 'Server bilan bog\'lanishda xatolik', 'error');
+    }
+}
+
+// Kirish (API orqali)
+async function login() {
+    const username = document.getElementById('login-username').value.trim();
+    const password = document.getElementById('login-password').value.trim();
+    const message = document.getElementById('login-message');
+
+    if (!username || !password) {
+        showMessage(message, 'Iltimos, barcha maydonlarni to\'ldiring', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/login`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ username, password })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            currentUser = username;
+
+            document.getElementById('login-page').style.display = 'none';
+            document.getElementById('register-page').style.display = 'none';
+            document.getElementById('app-page').style.display = 'block';
+            document.getElementById('welcome').innerHTML = `🎉 Xush kelibsiz, <span style="color:#33CCFF">${username}</span>!`;
+
+            // Effektlarni boshlash
+            startCountdown();
+            updateUserData();
+            connectGameSocket();
+            loadLeaderboard();
+            createConfetti();
+
+            message.innerHTML = '';
+            document.getElementById('login-username').value = '';
+            document.getElementById('login-password').value = '';
+        } else {
+            showMessage(message, data.detail || 'Noto\'g\'ri username yoki parol', 'error');
+        }
+    } catch (error) {
+        showMessage(message, 'Server bilan bog\'lanishda xatolik', 'error');
+    }
+}
+
+// Xabar ko'rsatish
+function showMessage(element, text, type) {
+    element.innerHTML = `<span style="color:${type === 'error' ? '#FF3366' : '#00D4A4'}; font-weight:600;">${text}</span>`;
+}
+
+// App sahifalarni ko'rsatish
+function showPage(pageId) {
+    // Sahifalarni yashirish
+    document.querySelectorAll('.page').forEach(page => {
+        page.style.display = 'none';
+        page.classList.remove('active');
+    });
+
+    // Navbarni yangilash
+    document.querySelectorAll('.nav-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+
+    // Tanlangan sahifani ko'rsatish
+    document.getElementById(pageId).style.display = 'block';
+    document.getElementById(pageId).classList.add('active');
+
+    // Tanlangan tugmani faollashtirish
+    const activeBtn = Array.from(document.querySelectorAll('.nav-btn')).find(btn => 
+        btn.textContent.includes(pageId === 'main' ? 'Asosiy' : 
+                               pageId === 'game' ? 'O\'yin' : 
+                               pageId === 'leaderboard' ? 'Reyting' : '')
+    );
+    if (activeBtn) activeBtn.classList.add('active');
+
+    // Sahifa o'zgarishida qo'shimcha amallar
+    if (pageId === 'leaderboard') {
+        openLeaderboardStream();
+    } else {
+        closeLeaderboardStream();
+    }
+    if (pageId === 'game') {
+        updateUserData();
+    }
+}
+
+// User ma'lumotlarini yangilash (API orqali)
+async function updateUserData() {
+    if (!currentUser) return;
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/user/${currentUser}`);
+        if (response.ok) {
+            const user = await response.json();
+            serverScore = user.score || 0;
+            document.getElementById('score').textContent = serverScore + pendingTaps;
+        }
+    } catch (error) {
+        console.error('Foydalanuvchi ma\'lumotlarini yuklashda xatolik:', error);
+    }
+}
+
+// Archani bosish - bosishlar mahalliy yig'iladi va to'plam bo'lib yuboriladi
+function tapTree(event) {
+    // Anti-spam: har 100ms dan keyin bitta bosish
+    const now = Date.now();
+    if (now - lastTapTime < tapDelay) return;
+    lastTapTime = now;
+
+    if (!currentUser) return;
+
+    let newScore;
+    if (gameSocket && gameSocket.readyState === WebSocket.OPEN) {
+        // WebSocket ochiq bo'lsa bosish darhol kichik kadr bo'lib ketadi
+        gameSocket.send('1');
+        socketSent++;
+        newScore = ++serverScore;
+    } else {
+        if (pendingTaps === 0) tapWindowStart = now;
+        pendingTaps++;
+        tapWindowEnd = now;
+        newScore = serverScore + pendingTaps;
+    }
+
+    // Ochkoni darhol ko'rsatish, server keyin tasdiqlaydi
+    document.getElementById('score').textContent = newScore;
+
+    // Effektlar yaratish
+    if (event) {
+        const x = event.clientX || event.touches[0].clientX;
+        const y = event.clientY || event.touches[0].clientY;
+
+        createSparkle(x, y);
+
+        // YANGI: Bosilganda chiqadigan xabarlar
+        const messages = ["🎉", "🌟", "✨", "🎄", "⛄", "🎁", "🔥", "💫"];
+        const randomMsg = messages[Math.floor(Math.random() * messages.length)];
+        createTapFeedback(x - 20, y - 50, randomMsg);
+    }
+
+    // Har 10 ochkoda confetti
+    if (newScore % 10 === 0) {
+        createConfetti();
+    }
+
+    if (pendingTaps > 0 && !tapFlushTimer) {
+        tapFlushTimer = setTimeout(flushTaps, tapFlushDelay);
+    }
+}
+
+// O'yin kanalini ochish (WebSocket orqali)
+function connectGameSocket() {
+    if (!('WebSocket' in window) || !currentUser) return;
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/game?username=${encodeURIComponent(currentUser)}`);
+    socketSent = 0;
+
+    socket.onmessage = (event) => {
+        const ack = JSON.parse(event.data);
+        // Server hali ko'rmagan bosishlarni ham hisobga olish
+        serverScore = ack.score + Math.max(socketSent - ack.received, 0);
+        document.getElementById('score').textContent = serverScore + pendingTaps;
+    };
+    socket.onclose = () => {
+        if (gameSocket === socket) gameSocket = null;
+    };
+    gameSocket = socket;
+}
+
+function closeGameSocket() {
+    if (gameSocket) {
+        gameSocket.close();
+        gameSocket = null;
+    }
+}
+
+// Yig'ilgan bosishlarni serverga yuborish (API orqali)
+async function flushTaps(keepalive = false) {
+    if (tapFlushTimer) {
+        clearTimeout(tapFlushTimer);
+        tapFlushTimer = null;
+    }
+    if (pendingTaps === 0 || !currentUser) return;
+
+    // Oldingi to'plam javobini kutish - oynalar ketma-ket bo'lishi kerak
+    if (tapFlushInFlight) {
+        tapFlushTimer = setTimeout(flushTaps, tapFlushDelay);
+        return;
+    }
+
+    const username = currentUser;
+    const batch = {
+        count: pendingTaps,
+        window_start: tapWindowStart,
+        window_end: tapWindowEnd
+    };
+    pendingTaps = 0;
+    tapFlushInFlight = true;
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/user/${username}/taps`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(batch),
+            keepalive
+        });
+
+        if (response.ok) {
+            const result = await response.json();
+            serverScore = result.score;
+        } else {
+            console.error('Bosishlar qabul qilinmadi:', response.status);
+        }
+    } catch (error) {
+        console.error('Ochkoni yangilashda xatolik:', error);
+    } finally {
+        tapFlushInFlight = false;
+        if (currentUser === username) {
+            document.getElementById('score').textContent = serverScore + pendingTaps;
+        }
+    }
+}
+
+// Leaderboard yuklash (API orqali)
+async function loadLeaderboard() {
+    try {
+        const response = await fetch(`${API_BASE_URL}/leaderboard`);
+        if (!response.ok) return;
+
+        const leaderboard = await response.json();
+        renderLeaderboard(leaderboard);
+        checkAround(leaderboard);
+    } catch (error) {
+        console.error('Leaderboard yuklashda xatolik:', error);
+    }
+}
+
+// Leaderboard ro'yxatini chizish
+function renderLeaderboard(leaderboard) {
+    let html = '';
+
+    if (leaderboard.length === 0) {
+        html = '<div style="text-align:center; padding:30px; color:rgba(255,255,255,0.5)">Hali hech kim o\'ynamagan</div>';
+    } else {
+        leaderboard.forEach((user, index) => {
+            const isCurrent = user.username === currentUser;
+            const medal = index === 0 ? '🥇' : 
+                         index === 1 ? '🥈' : 
+                         index === 2 ? '🥉' : 
+                         `${index + 1}.`;
+
+            html += `
+                <div class="leaderboard-item ${isCurrent ? 'current-user' : ''}">
+                    <div class="leaderboard-rank">${medal}</div>
+                    <div class="leaderboard-user">${user.username} ${isCurrent ? '⭐' : ''}</div>
+                    <div class="leaderboard-score">${user.score || 0} 🎄</div>
+                </div>
+            `;
+        });
+    }
+
+    document.getElementById('leaderboard-list').innerHTML = html;
+}
+
+// TOP 10 da bo'lmasa, atrofdagi o'yinchilarni ko'rsatish
+function checkAround(leaderboard) {
+    const inTop = leaderboard.some(user => user.username === currentUser);
+    if (inTop) {
+        document.getElementById('around-card').style.display = 'none';
+    } else {
+        loadAround();
+    }
+}
+
+// Jonli leaderboard: bitta to'liq snapshot, keyin faqat o'zgargan qatorlar (SSE orqali)
+function openLeaderboardStream() {
+    if (!('EventSource' in window)) {
+        loadLeaderboard();
+        return;
+    }
+    if (leaderboardStream) return;
+
+    leaderboardStream = new EventSource(`${API_BASE_URL}/leaderboard/stream`);
+    leaderboardStream.addEventListener('snapshot', (event) => {
+        leaderboardRows = JSON.parse(event.data).rows;
+        renderLeaderboard(leaderboardRows);
+        checkAround(leaderboardRows);
+    });
+    leaderboardStream.addEventListener('diff', (event) => {
+        const diff = JSON.parse(event.data);
+        diff.rows.forEach(row => {
+            leaderboardRows[row.rank - 1] = row;
+        });
+        leaderboardRows.length = diff.size;
+        renderLeaderboard(leaderboardRows);
+    });
+}
+
+function closeLeaderboardStream() {
+    if (leaderboardStream) {
+        leaderboardStream.close();
+        leaderboardStream = null;
+    }
+}
+
+// Foydalanuvchi atrofidagi o'yinchilar (API orqali)
+async function loadAround() {
+    if (!currentUser) return;
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/leaderboard/around/${currentUser}?k=3`);
+        if (!response.ok) return;
+
+        const around = await response.json();
+        let html = '';
+        around.players.forEach(user => {
+            const isCurrent = user.username === currentUser;
+            html += `
+                <div class="leaderboard-item ${isCurrent ? 'current-user' : ''}">
+                    <div class="leaderboard-rank">${user.rank}.</div>
+                    <div class="leaderboard-user">${user.username} ${isCurrent ? '⭐' : ''}</div>
+                    <div class="leaderboard-score">${user.score || 0} 🎄</div>
+                </div>
+            `;
+        });
+
+        document.getElementById('around-list').innerHTML = html;
+        document.getElementById('around-card').style.display = 'block';
+    } catch (error) {
+        console.error('Atrofdagi o\'yinchilarni yuklashda xatolik:', error);
+    }
+}
+
+// Countdown
+function startCountdown() {
+    function updateCountdown() {
+        const now = new Date();
+        const uzTime = new Date(now.getTime() + (5 * 60 * 60 * 1000));
+        const nextYear = uzTime.getUTCFullYear() + 1;
+        const newYearDate = new Date(Date.UTC(nextYear, 0, 1, 0, 0, 0));
+        const diff = newYearDate - uzTime;
+
+        if (diff <= 0) {
+            document.getElementById('days').textContent = '00';
+            document.getElementById('hours').textContent = '00';
+            document.getElementById('minutes').textContent = '00';
+            document.getElementById('seconds').textContent = '00';
+
+            // Yangi yil tabriki
+            if (document.getElementById('main').classList.contains('active')) {
+                document.querySelector('.welcome-title').innerHTML = '🎉 YANGI YIL MUBORAK! 🎉';
+                document.querySelector('.countdown-title').textContent = '🎉 Yangi Yil Keldi! 🎉';
+            }
+            return;
+        }
+
+        const days = Math.floor(diff / (1000 * 60 * 60 * 24));
+        const hours = Math.floor((diff / (1000 * 60 * 60)) % 24);
+        const minutes = Math.floor((diff / (1000 * 60)) % 60);
+        const seconds = Math.floor((diff / 1000) % 60);
+
+        document.getElementById('days').textContent = days.toString().padStart(2, '0');
+        document.getElementById('hours').textContent = hours.toString().padStart(2, '0');
+        document.getElementById('minutes').textContent = minutes.toString().padStart(2, '0');
+        document.getElementById('seconds').textContent = seconds.toString().padStart(2, '0');
+    }
+
+    updateCountdown();
+
+    if (countdownInterval) {
+        clearInterval(countdownInterval);
+    }
+
+    countdownInterval = setInterval(updateCountdown, 1000);
+}
+
+// Chiqish
+function logout() {
+    flushTaps(true);
+    closeGameSocket();
+    closeLeaderboardStream();
+    currentUser = null;
+    serverScore = 0;
+    document.getElementById('app-page').style.display = 'none';
+    document.getElementById('login-page').style.display = 'flex';
+
+    if (countdownInterval) {
+        clearInterval(countdownInterval);
+        countdownInterval = null;
+    }
+}
+
+// Sahifa yuklanganda
+window.onload = function() {
+    // Boshlang'ich sahifa sifatida kirish sahifasi ko'rsatilsin
+    showLogin();
+    createSnow();
+
+    // Qorni yangilash
+    if (snowInterval) clearInterval(snowInterval);
+    snowInterval = setInterval(createSnow, 30000);
+
+    // Telefon uchun optimallashtirish
+    if ('ontouchstart' in window) {
+        document.querySelector('.christmas-tree').style.cursor = 'pointer';
+    }
+
+    // Countdown boxlarga hover effekti
+    document.querySelectorAll('.countdown-box').forEach(box => {
+        box.addEventListener('touchstart', function() {
+            this.style.transform = 'translateY(-5px) scale(1.02)';
+        });
+
+        box.addEventListener('touchend', function() {
+            this.style.transform = 'translateY(0) scale(1)';
+        });
+    });
+};
+
+// Sahifa yopilganda yuborilmagan bosishlarni jo'natish
+window.addEventListener('pagehide', () => flushTaps(true));
+
+// Ekran o'lchami o'zgarganda
+window.addEventListener('resize', createSnow);
@@ -0,0 +1,351 @@
+# O'yin API si uchun yuklama benchmarki.
+#
+#   python benchmark.py                                  # ilova shu jarayonda (ASGI), 1k / 100k / 1M foydalanuvchi
+#   python benchmark.py --users 1000 --requests 5000     # tezkor tekshiruv
+#   python benchmark.py --url http://127.0.0.1:8000      # ishlab turgan uvicorn serveriga qarshi
+#   STORE=sqlite python benchmark.py --output sqlite.json
+#
+# Natija (o'tkazuvchanlik, p50/p95/p99 kechikish, status kodlari) JSON faylga yoziladi -
+# commitlar orasida solishtirish uchun faylda commit ham saqlanadi.
+# Qo'shimcha bog'liqlik: httpx (pip install httpx).
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Benchmark foydalanuvchilari: bench0, bench1, ... hammasi bitta parol bilan
+USER_PREFIX = "bench"
+PASSWORD = "bench-pass"
+
+# So'rovlar aralashmasi (og'irliklar): oddiy kun va yangi yil tuni to'lqini
+MIXES = {
+    "mixed": {
+        "register": 2, "login": 5, "increment": 30, "taps": 5, "update_score": 8,
+        "user": 25, "leaderboard": 25,
+    },
+    "midnight": {
+        "increment": 60, "taps": 15, "update_score": 5, "user": 10, "leaderboard": 10,
+    },
+}
+
+# Seed qilishda bir to'plamdagi foydalanuvchilar soni
+SEED_CHUNK = 10000
+
+
+# Tartiblangan ro'yxatdagi percentil (nearest-rank)
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+# Kechikishlar (soniya) bo'yicha qisqa hisobot, millisekundda
+def latency_summary(latencies: list) -> dict:
+    values = sorted(latencies)
+    return {
+        name: round(percentile(values, q) * 1000, 3) if values else None
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+    }
+
+
+# Joriy commit - natijalarni solishtirish uchun
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Benchmark mijozi: foydalanuvchi tanlash va har bir amal uchun so'rov yuborish
+class Workload:
+    def __init__(self, client, users: int, mix: dict, seed: int, tap_windows: dict, tap_rate: int):
+        self.client = client
+        self.users = users
+        self.ops = list(mix)
+        self.weights = list(mix.values())
+        self.random = random.Random(seed)
+        # Yangi ro'yxatdan o'tishlar uchun takrorlanmas nomlar
+        self.run_tag = format(self.random.getrandbits(32), "x")
+        self.registered = 0
+        # update_score doim joriydan katta bo'lishi uchun o'suvchi ochko (oldingi ishga tushirishlardan ham)
+        self.next_score = time.time_ns() // 1000
+        # Foydalanuvchi bo'yicha oxirgi yuborilgan bosishlar oynasining oxiri (ms) - server ham
+        # buni eslab qoladi, shuning uchun ssenariylar orasida bitta lug'at ishlatiladi
+        self.tap_windows = tap_windows
+        # Serverdagi MAX_TAPS_PER_SECOND
+        self.tap_rate = tap_rate
+        # Bosish ruxsati hali to'planmagani uchun yuborilmagan taps amallari
+        self.skipped_taps = 0
+
+    def pick_user(self) -> str:
+        return f"{USER_PREFIX}{self.random.randrange(self.users)}"
+
+    def pick_op(self) -> str:
+        return self.random.choices(self.ops, self.weights)[0]
+
+    async def request(self, op: str):
+        client = self.client
+        if op == "register":
+            self.registered += 1
+            username = f"new-{self.run_tag}-{self.registered}"
+            return await client.post("/register", json={"username": username, "password": PASSWORD})
+        username = self.pick_user()
+        if op == "login":
+            return await client.post("/login", json={"username": username, "password": PASSWORD})
+        if op == "increment":
+            return await client.post(f"/user/{username}/increment")
+        if op == "taps":
+            # Oynalar ustma-ust tushmasligi va tezlik chegarasidan oshmasligi kerak: chegaradagi +1 bosish
+            # faqat birinchi to'plamga beriladi, keyingilari oldingi oyna oxiridan beri o'tgan vaqtga sig'adi
+            now_ms = int(time.time() * 1000)
+            last_end = self.tap_windows.get(username)
+            if last_end is None:
+                start = end = now_ms
+                count = 1
+            else:
+                start = max(last_end + 1, now_ms - 1000)
+                end = max(start, now_ms)
+                count = min(5, (end - last_end) * self.tap_rate // 1000)
+                if count == 0:
+                    # Bu foydalanuvchi uchun hali bosish yo'q - server rad etadigan so'rov yuborilmaydi
+                    self.skipped_taps += 1
+                    return None
+            self.tap_windows[username] = end
+            return await client.post(f"/user/{username}/taps",
+                                     json={"count": count, "window_start": start, "window_end": end})
+        if op == "update_score":
+            self.next_score += 1
+            return await client.put("/update_score", json={"username": username, "score": self.next_score})
+        if op == "user":
+            return await client.get(f"/user/{username}")
+        if op == "leaderboard":
+            return await client.get("/leaderboard")
+        raise ValueError(op)
+
+
+# Bitta so'rovni o'lchash; kechikish started dan hisoblanadi
+async def measure(workload: Workload, op: str, started: float, samples: list):
+    try:
+        response = await workload.request(op)
+        if response is None:
+            return
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    samples.append((op, status, time.perf_counter() - started))
+
+
+# Yopiq sikl: concurrency ta mijoz ketma-ket so'rov yuboradi
+async def run_closed(workload: Workload, requests: int, concurrency: int, samples: list):
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await measure(workload, workload.pick_op(), time.perf_counter(), samples)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+# Ochiq sikl: so'rovlar javobni kutmasdan rate/s tezlikda keladi (yarim tun to'lqini).
+# Kechikish rejadagi kelish vaqtidan hisoblanadi - server ortda qolsa bu ham ko'rinadi.
+async def run_open(workload: Workload, requests: int, rate: float, samples: list):
+    tasks = []
+    begin = time.perf_counter()
+    for n in range(requests):
+        scheduled = begin + n / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(measure(workload, workload.pick_op(), scheduled, samples)))
+    await asyncio.gather(*tasks)
+
+
+# Yig'ilgan o'lchovlardan hisobot
+def report(scenario: str, users: int, samples: list, duration: float, extra: dict) -> dict:
+    by_op = defaultdict(list)
+    for op, status, latency in samples:
+        by_op[op].append((status, latency))
+    statuses = Counter(status for _, status, _ in samples)
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    result = {
+        "scenario": scenario,
+        "users": users,
+        "requests": len(samples),
+        **extra,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "ok_rps": round(ok / duration, 1),
+        "status": dict(statuses),
+        "latency_ms": latency_summary([latency for _, _, latency in samples]),
+        "ops": {},
+    }
+    for op, rows in sorted(by_op.items()):
+        result["ops"][op] = {
+            "requests": len(rows),
+            "status": dict(Counter(status for status, _ in rows)),
+            "latency_ms": latency_summary([latency for _, latency in rows]),
+        }
+    return result
+
+
+# Ilovani shu jarayonda yangi ma'lumotlar papkasida ishga tushirish va foydalanuvchilarni
+# to'g'ridan-to'g'ri omborga yozish (1M ni HTTP orqali ro'yxatdan o'tkazish juda uzoq)
+async def start_inprocess(users: int, seed: int):
+    os.chdir(tempfile.mkdtemp(prefix="bench-"))
+    if "app" in sys.modules:
+        app = importlib.reload(sys.modules["app"])
+    else:
+        sys.path.insert(0, BASE_DIR)
+        import app
+    await app.startup_event()
+
+    rng = random.Random(seed)
+    ts = app.now_ts()
+    for first in range(0, users, SEED_CHUNK):
+        with app.store.batch():
+            for n in range(first, min(users, first + SEED_CHUNK)):
+                username = f"{USER_PREFIX}{n}"
+                app.store.register(username, PASSWORD, ts)
+                app.store.set_score(username, rng.randrange(100000), ts)
+        await asyncio.sleep(0)
+    app.refresh_leaderboard_rows()
+    app.publish_read_view()
+    # Seed yozuvlari o'lchovdan oldin diskka tushadi (jurnal siqilishi ham shu yerda)
+    await app.store.flush()
+    await app.store.maintain()
+    return app
+
+
+# Ishlab turgan serverda hali yo'q benchmark foydalanuvchilarini HTTP orqali ro'yxatdan o'tkazish.
+# Oldingi seed bench0 dan boshlab ketma-ket yozgan, shuning uchun birinchi yo'q nom ikkilik qidiruv bilan
+# topiladi; parallel ishchilar chegarada qoldirgan bo'shliqlar uchun concurrency ta oldindan boshlanadi.
+async def user_exists(client, n: int) -> bool:
+    return (await client.get(f"/user/{USER_PREFIX}{n}")).status_code == 200
+
+
+async def seed_live(client, users: int, concurrency: int):
+    low, high = 0, users
+    while low < high:
+        middle = (low + high) // 2
+        if await user_exists(client, middle):
+            low = middle + 1
+        else:
+            high = middle
+    if low == users:
+        return
+    remaining = iter(range(max(0, low - concurrency), users))
+
+    async def worker():
+        for n in remaining:
+            await client.post("/register", json={"username": f"{USER_PREFIX}{n}", "password": PASSWORD})
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_scale(args, users: int) -> list:
+    seed_started = time.perf_counter()
+    app = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+        await seed_live(client, users, args.concurrency)
+        # Server bilan bir xil muhit o'zgaruvchisi
+        tap_rate = int(os.environ.get("MAX_TAPS_PER_SECOND", "10"))
+    else:
+        app = await start_inprocess(users, args.seed)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://bench",
+                                   timeout=args.timeout)
+        tap_rate = app.MAX_TAPS_PER_SECOND
+    seed_seconds = round(time.perf_counter() - seed_started, 3)
+
+    results = []
+    tap_windows = {}
+    try:
+        for scenario in args.scenarios:
+            workload = Workload(client, users, MIXES[scenario], args.seed, tap_windows, tap_rate)
+            samples = []
+            started = time.perf_counter()
+            if scenario == "midnight":
+                await run_open(workload, args.requests, args.surge_rate, samples)
+                extra = {"arrival_rate": args.surge_rate}
+            else:
+                await run_closed(workload, args.requests, args.concurrency, samples)
+                extra = {"concurrency": args.concurrency}
+            extra["skipped_taps"] = workload.skipped_taps
+            result = report(scenario, users, samples, time.perf_counter() - started, extra)
+            result["seed_s"] = seed_seconds
+            results.append(result)
+            print_result(result)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.shutdown_event()
+    return results
+
+
+def print_result(result: dict):
+    latency = result["latency_ms"]
+    print(f"{result['scenario']:>8} {result['users']:>8} foydalanuvchi: {result['throughput_rps']:>8} so'rov/s, "
+          f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, status {result['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="O'yin API si uchun yuklama benchmarki")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="foydalanuvchilar soni (bir nechta bo'lishi mumkin)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(MIXES), default=["mixed", "midnight"])
+    parser.add_argument("--requests", type=int, default=20000, help="har bir ssenariydagi so'rovlar soni")
+    parser.add_argument("--concurrency", type=int, default=100, help="mixed: bir vaqtdagi mijozlar")
+    parser.add_argument("--surge-rate", type=float, default=5000, help="midnight: soniyasiga keladigan so'rovlar")
+    parser.add_argument("--url", help="ishlab turgan server manzili (berilmasa ilova shu jarayonda)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--output", default="bench_results.json", help="JSON natija fayli")
+    args = parser.parse_args()
+
+    if httpx is None:
+        print("Benchmark uchun httpx kerak: pip install httpx")
+        sys.exit(1)
+
+    output = os.path.abspath(args.output)
+    runs = []
+    for users in args.users:
+        runs.extend(asyncio.run(run_scale(args, users)))
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.url or "asgi",
+            "store": os.environ.get("STORE", "memory"),
+            "python": platform.python_version(),
+            "seed": args.seed,
+            "runs": runs,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Natijalar yozildi: {output}")
+
+
+if __name__ == "__main__":
+    main()
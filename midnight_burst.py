@@ -0,0 +1,177 @@
+# Qabul nazorati uchun sintetik yarim tun to'lqini.
+#
+#   python midnight_burst.py
+#   python midnight_burst.py --users 5000 --taps 4 --reads 10000 --rate 50000
+#
+# ASGI ilova to'g'ridan-to'g'ri chaqiriladi (HTTP mijoz narxisiz), shuning uchun to'lqinda server
+# o'zi tor joy bo'ladi. Tekshiriladi:
+#   - navbatdagi so'rov joy bo'shagan siklning o'zida bekor qilinsa joy yo'qolmaydi;
+#   - sig'imdan past oqimda hech narsa rad etilmaydi;
+#   - to'lqinda ortig'i 503 + Retry-After oladi, o'qishlar yozuvlardan oldin rad etiladi,
+#     qabul qilingan har bir bosish hisobga tushadi va oxirida band joy qolmaydi.
+# Biror shart buzilsa skript xato bilan tugaydi.
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sozlamalar ilova import qilinishidan oldin o'qiladi
+os.environ.setdefault("ADMISSION_MAX_CONCURRENT", "64")
+os.environ.setdefault("ADMISSION_MAX_QUEUE", "512")
+os.chdir(tempfile.mkdtemp(prefix="burst-"))
+sys.path.insert(0, BASE_DIR)
+import app  # noqa: E402
+
+
+# Bitta so'rovni ilovaga to'g'ridan-to'g'ri yuborish: (status, Retry-After)
+async def call(method: str, path: str, body: bytes = b"") -> tuple:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"burst"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1), "server": ("burst", 80),
+    }
+    sent = False
+    start = {}
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start["status"] = message["status"]
+            start["retry_after"] = dict(message["headers"]).get(b"retry-after")
+
+    await app.app(scope, receive, send)
+    return start["status"], start["retry_after"]
+
+
+def check(condition: bool, message: str):
+    if not condition:
+        print(f"XATO: {message}")
+        sys.exit(1)
+
+
+def admission_idle() -> bool:
+    return app.admission_active == 0 and not any(app.admission_waiters)
+
+
+# Joy bo'shagan siklda bekor qilingan kutuvchilar joyni yo'qotmasligi kerak
+async def check_cancellation():
+    limit, queue = app.ADMISSION_MAX_CONCURRENT, app.ADMISSION_MAX_QUEUE
+    app.ADMISSION_MAX_CONCURRENT, app.ADMISSION_MAX_QUEUE = 1, 1
+    try:
+        check(await app.admission_acquire(0), "birinchi joy berilmadi")
+        waiter = asyncio.create_task(app.admission_acquire(0))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        app.admission_release()
+        await asyncio.sleep(0)
+        check(admission_idle(), f"bekor qilingan yozuvchidan keyin joy qaytmadi: {app.admission_active}")
+
+        # Navbat to'la, undagi o'qish bekor qilingan: yozuv uning o'rnini oladi
+        check(await app.admission_acquire(0), "joy berilmadi")
+        reader = asyncio.create_task(app.admission_acquire(1))
+        await asyncio.sleep(0)
+        reader.cancel()
+        writer = asyncio.create_task(app.admission_acquire(0))
+        await asyncio.sleep(0)
+        app.admission_release()
+        check(await writer, "yozuv bekor qilingan o'qish o'rnini olmadi")
+        app.admission_release()
+        await asyncio.sleep(0)
+        check(admission_idle(), f"bekor qilingan o'qishdan keyin joy qaytmadi: {app.admission_active}")
+    finally:
+        app.ADMISSION_MAX_CONCURRENT, app.ADMISSION_MAX_QUEUE = limit, queue
+    print("bekor qilish: joy yo'qolmadi")
+
+
+# Ochiq sikl: so'rovlar rate/s tezlikda, javobni kutmasdan keladi
+async def burst(jobs: list, rate: float) -> dict:
+    results = defaultdict(list)
+
+    async def one(kind, method, path, scheduled):
+        status, retry_after = await call(method, path)
+        results[kind].append((status, retry_after, time.perf_counter() - scheduled))
+
+    tasks = []
+    begin = time.perf_counter()
+    for n, (kind, method, path) in enumerate(jobs):
+        scheduled = begin + n / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(kind, method, path, scheduled)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def summary(name: str, results: dict):
+    for kind in ("write", "read"):
+        rows = results[kind]
+        latencies = sorted(latency for status, _, latency in rows if status == 200)
+        p99 = round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 1) if latencies else None
+        print(f"{name} {kind}: {dict(Counter(status for status, _, _ in rows))}, 200 p99 {p99} ms")
+
+
+async def main(args):
+    await app.startup_event()
+    try:
+        await check_cancellation()
+
+        for n in range(args.users):
+            await call("POST", "/register", b'{"username": "burst%d", "password": "1234"}' % n)
+        rng = random.Random(2025)
+
+        def jobs(taps: int, reads: int) -> list:
+            items = [("write", "POST", f"/user/burst{n}/increment") for n in range(args.users) for _ in range(taps)]
+            items += [("read", "GET", "/leaderboard" if n % 2 else f"/user/burst{n % args.users}") for n in range(reads)]
+            rng.shuffle(items)
+            return items
+
+        # Sig'imdan past oqim - rad etish bo'lmasligi kerak
+        calm = await burst(jobs(1, args.users), args.calm_rate)
+        summary("oddiy", calm)
+        statuses = Counter(status for rows in calm.values() for status, _, _ in rows)
+        check(set(statuses) == {200}, f"oddiy oqimda rad etishlar: {dict(statuses)}")
+
+        # Yarim tun to'lqini
+        taps_before = app.store.total_score()
+        results = await burst(jobs(args.taps, args.reads), args.rate)
+        summary("to'lqin", results)
+        everything = [row for rows in results.values() for row in rows]
+        check({status for status, _, _ in everything} <= {200, 503}, "kutilmagan status kodlari")
+        shed = [row for row in everything if row[0] == 503]
+        check(shed, "to'lqinda hech narsa rad etilmadi - --rate ni oshiring")
+        check(all(retry_after for _, retry_after, _ in shed), "503 javobda Retry-After yo'q")
+
+        def shed_share(kind: str) -> float:
+            return sum(1 for status, _, _ in results[kind] if status == 503) / len(results[kind])
+        check(shed_share("read") >= shed_share("write"), "o'qishlar yozuvlardan kam rad etildi")
+
+        accepted = sum(1 for status, _, _ in results["write"] if status == 200)
+        check(app.store.total_score() - taps_before == accepted, "qabul qilingan bosishlar hisobga tushmadi")
+        check(admission_idle(), f"to'lqindan keyin band joy qoldi: {app.admission_active}")
+        print("to'lqin: barcha shartlar bajarildi")
+    finally:
+        await app.shutdown_event()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qabul nazorati uchun sintetik yarim tun to'lqini")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--taps", type=int, default=4, help="to'lqinda har foydalanuvchining bosishlari")
+    parser.add_argument("--reads", type=int, default=4000, help="to'lqindagi o'qishlar")
+    parser.add_argument("--rate", type=float, default=50000, help="to'lqinda soniyasiga keladigan so'rovlar")
+    parser.add_argument("--calm-rate", type=float, default=2000, help="oddiy oqimda soniyasiga so'rovlar")
+    asyncio.run(main(parser.parse_args()))